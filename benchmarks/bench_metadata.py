@@ -0,0 +1,72 @@
+"""Compare building Column records positionally into slotted dataclasses with the
+dict-backed dataclasses built through dict(zip(...)) that they replaced.
+
+    python benchmarks/bench_metadata.py --columns 200000
+
+The ClickHouse environment variables must be set, as importing the server
+module loads the configuration, but no server is contacted.
+"""
+
+import argparse
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+
+from mcp_clickhouse.mcp_server import result_to_column
+
+
+@dataclass
+class DictColumn:
+    database: str
+    table: str
+    name: str
+    column_type: str
+    default_kind: Optional[str]
+    default_expression: Optional[str]
+    comment: Optional[str]
+
+
+def previous_path(query_columns, rows):
+    return [DictColumn(**dict(zip(query_columns, row))) for row in rows]
+
+
+def current_path(query_columns, rows):
+    return result_to_column(query_columns, rows)
+
+
+def allocated_bytes(build, query_columns, rows) -> int:
+    tracemalloc.start()
+    records = build(query_columns, rows)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--columns", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    query_columns = (
+        "database", "table", "name", "column_type", "default_kind", "default_expression", "comment"
+    )
+    rows = [
+        ("bench", f"table_{i // 20}", f"column_{i % 20}", "String", "", "", "")
+        for i in range(args.columns)
+    ]
+    print(f"{args.columns} columns")
+    for name, build in (("dict(zip(...))", previous_path), ("slots, positional", current_path)):
+        best = min(
+            timeit.repeat(
+                lambda build=build: build(query_columns, rows), number=1, repeat=args.repeat
+            )
+        )
+        size = allocated_bytes(build, query_columns, rows)
+        print(f"{name:18} {best * 1000:8.1f} ms {size / 1_048_576:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare the list_tables serialization path with the asdict() path it replaced.
+
+Builds a synthetic schema of Table and Column dataclasses and times converting
+it to the list_tables result and encoding that as the tool response:
+
+    python benchmarks/bench_serialization.py --tables 2000 --columns 20
+
+The ClickHouse environment variables must be set, as importing the server
+module loads the configuration, but no server is contacted.
+"""
+
+import argparse
+import timeit
+from dataclasses import asdict
+
+import pydantic_core
+
+from mcp_clickhouse.mcp_server import Column, Table
+from mcp_clickhouse.serialization import dumps, orjson, to_builtins
+
+
+def make_tables(table_count: int, column_count: int):
+    tables = []
+    for t in range(table_count):
+        name = f"table_{t}"
+        columns = [
+            Column("bench", name, f"column_{c}", "Nullable(String)", "", "", f"Column {c}")
+            for c in range(column_count)
+        ]
+        tables.append(
+            Table(
+                "bench",
+                name,
+                "MergeTree",
+                f"CREATE TABLE bench.{name} (...) ENGINE = MergeTree ORDER BY column_0",
+                [],
+                [],
+                "MergeTree ORDER BY column_0 SETTINGS index_granularity = 8192",
+                "column_0",
+                "column_0",
+                1_000_000 + t,
+                64_000_000 + t,
+                f"Table {t}",
+                columns,
+            )
+        )
+    return tables
+
+
+def previous_path(tables):
+    # [asdict(table) ...] in list_tables_sync, then FastMCP's default serializer
+    result = [asdict(table) for table in tables]
+    return pydantic_core.to_json(result, fallback=str, indent=2).decode()
+
+
+def current_path(tables):
+    return dumps(to_builtins(tables))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tables", type=int, default=2000)
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tables = make_tables(args.tables, args.columns)
+    print(f"{args.tables} tables, {args.tables * args.columns} columns")
+    print(f"encoder: {'orjson' if orjson else 'pydantic-core'}")
+    paths = (("asdict + indented JSON", previous_path), ("to_builtins + dumps", current_path))
+    for name, path in paths:
+        best = min(timeit.repeat(lambda path=path: path(tables), number=1, repeat=args.repeat))
+        size = len(path(tables))
+        print(f"{name:24} {best * 1000:9.1f} ms {size / 1_048_576:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
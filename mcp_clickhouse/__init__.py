@@ -1,19 +1,36 @@
-from .mcp_server import (
-    create_clickhouse_client,
-    list_databases,
-    list_tables,
-    run_select_query,
-    create_chdb_client,
-    run_chdb_select_query,
-    chdb_initial_prompt,
-)
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .mcp_server import (
+        create_clickhouse_client,
+        get_clickhouse_pool,
+        list_databases,
+        list_tables,
+        describe_table,
+        run_select_query,
+        create_chdb_client,
+        run_chdb_select_query,
+        chdb_initial_prompt,
+    )
 
 __all__ = [
     "list_databases",
     "list_tables",
+    "describe_table",
     "run_select_query",
     "create_clickhouse_client",
+    "get_clickhouse_pool",
     "create_chdb_client",
     "run_chdb_select_query",
     "chdb_initial_prompt",
 ]
+
+
+def __getattr__(name):
+    # The server is set up on first use, so that chDB worker processes, which only
+    # import mcp_clickhouse.chdb_worker, start quickly
+    if name in __all__:
+        from . import mcp_server
+
+        return getattr(mcp_server, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
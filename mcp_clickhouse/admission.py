@@ -0,0 +1,205 @@
+"""Admission control in front of the query executor.
+
+Every piece of tool work needs an admission slot before it is handed to the
+executor. Slots are limited overall and per client, the queue of waiting requests
+is bounded, and a request that would overflow it is rejected right away instead of
+waiting until it times out. When a slot frees up, the waiting clients are served by
+weighted fair queuing, so a client that sends a burst of requests only delays its
+own requests.
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ServerBusyError(Exception):
+    """Raised when a request cannot be queued because a queue limit is reached."""
+
+
+@dataclass(eq=False)
+class _Waiter:
+    client: str
+    tag: float
+    seq: int
+    loop: asyncio.AbstractEventLoop
+    future: asyncio.Future
+    granted: bool = False
+
+
+@dataclass
+class _ClientState:
+    active: int = 0
+    queued: int = 0
+    # Virtual finish time of the client's most recently queued request
+    last_tag: float = 0.0
+    waiters: List[_Waiter] = field(default_factory=list)
+
+
+class AdmissionController:
+    """Bounded, fair admission of concurrent requests.
+
+    Args:
+        max_active: Maximum number of admitted requests across all clients
+        max_queued: Maximum number of waiting requests across all clients
+        max_active_per_client: Maximum number of admitted requests per client, 0 for no limit
+        max_queued_per_client: Maximum number of waiting requests per client, 0 for no limit
+        weights: Relative share of each client when slots are contended (default 1)
+    """
+
+    def __init__(
+        self,
+        max_active: int,
+        max_queued: int,
+        max_active_per_client: int = 0,
+        max_queued_per_client: int = 0,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.max_active_per_client = max_active_per_client
+        self.max_queued_per_client = max_queued_per_client
+        self.weights = dict(weights or {})
+
+        self._lock = threading.Lock()
+        self._clients: Dict[str, _ClientState] = defaultdict(_ClientState)
+        self._active = 0
+        self._queued = 0
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        self._rejected = 0
+
+    async def acquire(self, client: str) -> None:
+        """Wait for an admission slot for client.
+
+        Raises:
+            ServerBusyError: If the request cannot be queued
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._clients[client]
+            if self._queued == 0 and self._can_admit(state):
+                self._admit(state)
+                return
+            if self._queued >= self.max_queued:
+                self._reject(client, state)
+                raise ServerBusyError(
+                    f"Server busy: {self._queued} requests are already waiting, retry later"
+                )
+            if self.max_queued_per_client and state.queued >= self.max_queued_per_client:
+                self._reject(client, state)
+                raise ServerBusyError(
+                    f"Server busy: this client already has {state.queued} requests waiting, "
+                    "retry later"
+                )
+            # Weighted fair queuing: the request finishes 1/weight after the later of
+            # the current virtual time and the client's previous request
+            tag = max(self._virtual_time, state.last_tag) + 1 / self.weights.get(client, 1)
+            state.last_tag = tag
+            waiter = _Waiter(client, tag, next(self._seq), loop, loop.create_future())
+            state.waiters.append(waiter)
+            state.queued += 1
+            self._queued += 1
+            # Other clients' requests may be queued only because they are at their
+            # own limit, in which case this one can be admitted right away
+            granted = self._dispatch()
+        self._notify(granted)
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    state.waiters.remove(waiter)
+                    state.queued -= 1
+                    self._queued -= 1
+                    self._forget_if_idle(client, state)
+            if granted:
+                # The slot was handed over just as the caller gave up
+                self.release(client)
+            raise
+
+    def release(self, client: str) -> None:
+        """Give back a slot taken by acquire() and admit the next waiting request."""
+        with self._lock:
+            state = self._clients[client]
+            state.active -= 1
+            self._active -= 1
+            granted = self._dispatch()
+            self._forget_if_idle(client, state)
+        self._notify(granted)
+
+    def stats(self) -> dict:
+        """Get a snapshot of admission counters."""
+        with self._lock:
+            return {
+                "active": self._active,
+                "queued": self._queued,
+                "max_active": self.max_active,
+                "max_queued": self.max_queued,
+                "rejected": self._rejected,
+                "clients": {
+                    name: {"active": s.active, "queued": s.queued}
+                    for name, s in self._clients.items()
+                },
+            }
+
+    def _can_admit(self, state: _ClientState) -> bool:
+        if self._active >= self.max_active:
+            return False
+        return not self.max_active_per_client or state.active < self.max_active_per_client
+
+    def _admit(self, state: _ClientState) -> None:
+        state.active += 1
+        self._active += 1
+
+    def _reject(self, client: str, state: _ClientState) -> None:
+        self._rejected += 1
+        logger.warning(f"Rejected request from client {client}: admission queue is full")
+        self._forget_if_idle(client, state)
+
+    def _forget_if_idle(self, client: str, state: _ClientState) -> None:
+        if not state.active and not state.queued:
+            self._clients.pop(client, None)
+
+    def _notify(self, granted: List[_Waiter]) -> None:
+        for waiter in granted:
+            try:
+                waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+            except RuntimeError:
+                # The waiter's event loop has been closed, so nobody will use the slot
+                self.release(waiter.client)
+
+    def _dispatch(self) -> List[_Waiter]:
+        """Admit waiting requests in virtual finish order while slots are free."""
+        granted = []
+        while self._active < self.max_active:
+            candidates = [
+                state.waiters[0]
+                for state in self._clients.values()
+                if state.waiters and self._can_admit(state)
+            ]
+            if not candidates:
+                break
+            waiter = min(candidates, key=lambda w: (w.tag, w.seq))
+            state = self._clients[waiter.client]
+            state.waiters.pop(0)
+            state.queued -= 1
+            self._queued -= 1
+            self._admit(state)
+            self._virtual_time = waiter.tag
+            waiter.granted = True
+            granted.append(waiter)
+        return granted
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
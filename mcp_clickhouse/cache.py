@@ -0,0 +1,154 @@
+"""In-process LRU cache with a TTL and fingerprint revalidation.
+
+Agents look up the same schema metadata over and over, while the metadata itself
+rarely changes. Cached values are served straight from memory for ttl seconds.
+After that, a value is only rebuilt if a cheap fingerprint of the underlying data
+(for tables, their names, count, latest metadata_modification_time and total rows
+and bytes) has changed.
+
+The same cache, given a byte budget, holds the results of repeated SELECT queries.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    fingerprint: Any
+    stored_at: float
+    size: int = 0
+
+
+class TTLCache:
+    """A thread-safe LRU cache whose entries go stale after ttl seconds.
+
+    Cached values are shared between callers and must not be mutated.
+
+    Args:
+        max_entries: Maximum number of entries kept, 0 disables the cache
+        ttl: Seconds an entry is served without revalidation
+        max_bytes: Maximum total size of the entries, as given to put(), 0 for no limit
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 60, max_bytes: int = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._revalidations = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable, fingerprint: Optional[Callable[[], Any]] = None):
+        """Get a cached value, or None on a miss.
+
+        A stale entry is dropped, unless fingerprint is given: it is then called to
+        compute the current fingerprint, and if that matches the one the value was
+        stored with, the entry is fresh again for another ttl seconds.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.stored_at < self.ttl:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry.value
+        if entry is not None and fingerprint is not None and fingerprint() == entry.fingerprint:
+            with self._lock:
+                entry.stored_at = time.monotonic()
+                self._hits += 1
+                self._revalidations += 1
+            return entry.value
+        with self._lock:
+            if entry is not None and self._entries.get(key) is entry:
+                self._remove(key)
+            self._misses += 1
+        return None
+
+    def put(self, key: Hashable, value: Any, fingerprint: Any = None, size: int = 0) -> None:
+        """Store a value, evicting the least recently used entries if the cache is full.
+
+        Values larger than the whole byte budget are not stored.
+        """
+        if self.max_entries <= 0 or (self.max_bytes and size > self.max_bytes):
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _CacheEntry(value, fingerprint, time.monotonic(), size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes and self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Get a snapshot of the cache counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "revalidations": self._revalidations,
+                "evictions": self._evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: Hashable) -> None:
+        self._bytes -= self._entries.pop(key).size
+
+
+# String literals and quoted identifiers, which are kept verbatim
+_QUOTED = re.compile(r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`(?:[^`\\]|\\.)*`""")
+_WHITESPACE = re.compile(r"\s+")
+
+# Functions whose result changes from one run to the next, and system tables,
+# which describe the live state of the server
+_NON_DETERMINISTIC = re.compile(
+    r"\b(?:now|now64|nowInBlock|today|yesterday|rand\w*|random\w*|generateUUID\w*|"
+    r"generateULID|generateSnowflakeID|fuzzBits|uptime|currentQueryID|queryID|"
+    r"initialQueryID|rowNumberInAllBlocks|blockNumber)\s*\(|\bsystem\s*\.",
+    re.IGNORECASE,
+)
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace outside of quotes and drop a trailing semicolon.
+
+    Queries that only differ in formatting normalize to the same text.
+    """
+    parts = []
+    last = 0
+    for match in _QUOTED.finditer(query):
+        parts.append(_WHITESPACE.sub(" ", query[last : match.start()]))
+        parts.append(match.group())
+        last = match.end()
+    parts.append(_WHITESPACE.sub(" ", query[last:]))
+    return "".join(parts).strip().rstrip(";").rstrip()
+
+
+def is_deterministic_query(query: str) -> bool:
+    """Check that a query calls no time, random or id functions and reads no system tables."""
+    return not _NON_DETERMINISTIC.search(_QUOTED.sub("''", query))
@@ -0,0 +1,242 @@
+"""Arrow results for chDB queries.
+
+chDB writes ArrowStream results into a buffer that pyarrow reads in place, so rows
+are built from columnar data instead of parsing JSON text that is several times
+larger than the result.
+
+Arrow cannot represent every ClickHouse type faithfully. chDB writes Date as uint16
+days, DateTime as uint32 seconds, Enum8 as int8 and IPv4 as uint32, and fails on
+UUID columns, after which its next result is corrupted. The result columns are
+therefore looked up with DESCRIBE before the query runs, and a query returning
+any type without a faithful Arrow form is read as JSON instead. Dates, times and
+decimals are converted inside Arrow to the values the JSON output has.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+import pyarrow
+import pyarrow.ipc
+
+# Written to the chDB session once, since the result never leaves the process
+DISABLE_COMPRESSION_SETTING = "SET output_format_arrow_compression_method = 'none'"
+
+# ClickHouse types read from Arrow without conversion
+_PLAIN_TYPES = {
+    "Int8",
+    "Int16",
+    "Int32",
+    "Int64",
+    "UInt8",
+    "UInt16",
+    "UInt32",
+    "UInt64",
+    "Float32",
+    "Float64",
+    "String",
+    "Bool",
+}
+_UTC_TIMEZONES = {"UTC", "Etc/UTC"}
+# DateTime64 precisions that Arrow timestamps are written with
+_TIMESTAMP_PRECISIONS = {"0", "3", "6", "9"}
+
+_WRAPPER_TYPE = re.compile(r"^(?:Nullable|LowCardinality)\((.*)\)$")
+_ARRAY_TYPE = re.compile(r"^Array\((.*)\)$")
+_DATETIME_TYPE = re.compile(r"^DateTime(?:\('([^']*)'\))?$")
+_DATETIME64_TYPE = re.compile(r"^DateTime64\((\d+)(?:, *'([^']*)')?\)$")
+_DECIMAL_TYPE = re.compile(r"^Decimal(?:32|64|128|256)?\(.*\)$")
+
+
+class ArrowUnsupportedError(Exception):
+    """Raised when a result cannot be read faithfully from Arrow."""
+
+
+@dataclass(slots=True)
+class ChDBResult:
+    """A chDB query result, before it is converted to rows."""
+
+    # ArrowStream buffer, or JSON text if column_types is None
+    data: Any
+    column_types: Optional[List[str]] = None
+    session_timezone: Optional[str] = None
+    # Keeps the chDB result that data is a view of alive
+    owner: Any = None
+
+
+def describe_query(query: str) -> str:
+    """Get the query that lists the ClickHouse column types of query's result."""
+    return f"DESCRIBE ({query.strip().rstrip(';')})"
+
+
+def _base_type(clickhouse_type: str) -> str:
+    while True:
+        match = _WRAPPER_TYPE.match(clickhouse_type)
+        if match is None:
+            return clickhouse_type
+        clickhouse_type = match.group(1)
+
+
+def _is_utc(timezone: Optional[str], session_timezone: Optional[str]) -> bool:
+    return (timezone or session_timezone) in _UTC_TIMEZONES
+
+
+def uses_session_timezone(column_types: List[str]) -> bool:
+    """Check whether any column is a DateTime without a timezone of its own."""
+    for clickhouse_type in column_types:
+        base = _base_type(clickhouse_type)
+        datetime = _DATETIME_TYPE.match(base) or _DATETIME64_TYPE.match(base)
+        if datetime is not None and datetime.groups()[-1] is None:
+            return True
+    return False
+
+
+def _converter(clickhouse_type: str, session_timezone: Optional[str]):
+    """Get the function that converts an Arrow column of clickhouse_type.
+
+    Returns None if the column is read as it is, and raises ArrowUnsupportedError
+    if it cannot be read from Arrow.
+    """
+    base = _base_type(clickhouse_type)
+    if base in _PLAIN_TYPES:
+        return None
+    # Arrays are read as they are, so only arrays of plain types
+    array = _ARRAY_TYPE.match(base)
+    if array is not None:
+        while array is not None:
+            base = _base_type(array.group(1))
+            array = _ARRAY_TYPE.match(base)
+        if base in _PLAIN_TYPES:
+            return None
+        raise ArrowUnsupportedError(f"Cannot read {clickhouse_type} column from Arrow")
+    if base == "Date":
+        return lambda column: column.cast(pyarrow.int32()).cast(pyarrow.date32()).cast(
+            pyarrow.string()
+        )
+    if base == "Date32":
+        return lambda column: column.cast(pyarrow.string())
+    if _DECIMAL_TYPE.match(base):
+        return lambda column: column.cast(pyarrow.float64())
+    # Times are formatted as wall clock times, which Arrow only does quickly in UTC
+    datetime = _DATETIME_TYPE.match(base)
+    if datetime is not None and _is_utc(datetime.group(1), session_timezone):
+        return lambda column: column.cast(pyarrow.int64()).cast(pyarrow.timestamp("s")).cast(
+            pyarrow.string()
+        )
+    datetime64 = _DATETIME64_TYPE.match(base)
+    if (
+        datetime64 is not None
+        and datetime64.group(1) in _TIMESTAMP_PRECISIONS
+        and _is_utc(datetime64.group(2), session_timezone)
+    ):
+        return lambda column: column.cast(pyarrow.timestamp(column.type.unit)).cast(
+            pyarrow.string()
+        )
+    raise ArrowUnsupportedError(f"Cannot read {clickhouse_type} column from Arrow")
+
+
+def check_arrow_types(column_types: List[str], session_timezone: Optional[str]) -> None:
+    """Check that columns of the given ClickHouse types can be read from Arrow.
+
+    Raises:
+        ArrowUnsupportedError: If a column cannot be read from Arrow
+    """
+    for clickhouse_type in column_types:
+        _converter(clickhouse_type, session_timezone)
+
+
+def fetch_result(
+    query_fn: Callable[[str, str], Any], query: str, arrow: bool = True
+) -> ChDBResult:
+    """Run a chDB query, as Arrow if its result can be read faithfully from Arrow.
+
+    Args:
+        query_fn: Runs SQL in a chDB session in a given output format
+        query: The query to run
+        arrow: False to read the result as JSON text in any case
+
+    Raises:
+        RuntimeError: If the query fails
+    """
+    if arrow:
+        try:
+            column_types = _describe(query_fn, query)
+            session_timezone = None
+            if uses_session_timezone(column_types):
+                session_timezone = query_fn("SELECT timezone()", "CSV").data().strip().strip('"')
+            check_arrow_types(column_types, session_timezone)
+        except ArrowUnsupportedError:
+            pass
+        else:
+            res = _checked(query_fn(query, "ArrowStream"))
+            data = res.get_memview().view() if res.size() else b""
+            return ChDBResult(data, column_types, session_timezone, owner=res)
+    res = _checked(query_fn(query, "JSON"))
+    return ChDBResult(res.data())
+
+
+def _describe(query_fn, query: str) -> List[str]:
+    try:
+        described = _checked(query_fn(describe_query(query), "JSONCompact"))
+    except RuntimeError as e:
+        # Not a SELECT, or invalid, in which case the query itself reports why
+        raise ArrowUnsupportedError(f"Cannot describe the result columns: {e}") from e
+    return [row[1] for row in json.loads(described.data())["data"]]
+
+
+def _checked(res):
+    if res.has_error():
+        raise RuntimeError(res.error_message())
+    return res
+
+
+def result_to_rows(result: ChDBResult) -> List[dict]:
+    """Convert a result to a list of row dicts.
+
+    Raises:
+        ArrowUnsupportedError: If an Arrow result cannot be converted, in which case
+            the query should be read as JSON instead
+    """
+    if result.column_types is None:
+        if not result.data:
+            return []
+        return json.loads(result.data).get("data", [])
+    if not len(result.data):
+        return []
+    table = read_arrow_table(result.data)
+    return arrow_to_rows(table, result.column_types, result.session_timezone)
+
+
+def read_arrow_table(buffer):
+    """Read an ArrowStream result from a buffer, without copying it."""
+    return pyarrow.ipc.open_stream(pyarrow.py_buffer(buffer)).read_all()
+
+
+def arrow_to_rows(
+    table, column_types: List[str], session_timezone: Optional[str]
+) -> List[dict]:
+    """Convert an Arrow table to a list of row dicts, as the JSON output has them.
+
+    Args:
+        table: Result read with read_arrow_table()
+        column_types: ClickHouse type of each column, in order
+        session_timezone: Timezone of DateTime columns without one of their own
+
+    Raises:
+        ArrowUnsupportedError: If a column cannot be read from Arrow
+    """
+    if len(column_types) != table.num_columns:
+        raise ArrowUnsupportedError(
+            f"Expected {len(column_types)} columns, the result has {table.num_columns}"
+        )
+    for index, clickhouse_type in enumerate(column_types):
+        convert = _converter(clickhouse_type, session_timezone)
+        if convert is not None:
+            column = convert(table.column(index))
+            table = table.set_column(index, table.field(index).name, column)
+    try:
+        return table.to_pylist()
+    except UnicodeDecodeError as e:
+        # Strings that are not valid UTF-8, which the JSON output escapes
+        raise ArrowUnsupportedError(str(e)) from e
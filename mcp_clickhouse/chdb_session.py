@@ -0,0 +1,103 @@
+"""A chDB session shared by the chDB executor threads.
+
+chDB runs a single embedded engine per process. Every Session or connection is a
+handle on that engine, creating a Session closes the previous one, and closing
+any handle shuts the engine down for all of them. The engine also runs one query
+at a time, whichever handle it comes through and even though it releases the GIL.
+A pool of sessions or a session per thread therefore adds no parallelism and makes
+handles close each other.
+
+The threads share one session instead and take turns under an explicit lock. A
+query waiting for its turn is visible and bounded by a timeout, rather than
+queued inside chDB, where it could not be timed out or observed. Whatever is left
+of the timeout once the query has the session is passed to chDB as
+max_execution_time, so the engine stops a query that overruns it and frees its
+memory, instead of running it to completion for a caller that has given up.
+"""
+
+import threading
+import time
+from typing import Optional
+
+# max_execution_time of 0 means no limit, so a spent timeout still sets a small one
+MIN_EXECUTION_TIME_SECS = 0.001
+
+
+def execution_time_setting(seconds: Optional[float]) -> str:
+    """Get the SET statement that makes chDB stop queries after seconds, or never if None."""
+    if seconds is None:
+        return "SET max_execution_time = 0"
+    return f"SET max_execution_time = {max(seconds, MIN_EXECUTION_TIME_SECS):.3f}"
+
+
+class ChDBBusyError(Exception):
+    """Raised when the session does not become free within the timeout."""
+
+
+class SharedChDBSession:
+    """A chDB session that runs one query at a time for any number of threads.
+
+    Args:
+        session: The chdb.session.Session to share
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._waiting = 0
+        self._queries = 0
+        self._wait_seconds = 0.0
+        # Whether a max_execution_time was set, which queries without a timeout reset
+        self._limited = False
+
+    def query(self, sql: str, fmt: str = "CSV", timeout: Optional[float] = None):
+        """Run a query once the session is free.
+
+        The timeout covers both waiting for the session and running the query.
+
+        Raises:
+            ChDBBusyError: If the session is still running other queries after
+                timeout seconds
+            RuntimeError: If the query fails, including when chDB stops it for
+                overrunning the timeout
+        """
+        started_at = time.monotonic()
+        with self._stats_lock:
+            self._waiting += 1
+        try:
+            acquired = self._lock.acquire(timeout=-1 if timeout is None else timeout)
+        finally:
+            with self._stats_lock:
+                self._waiting -= 1
+                self._wait_seconds += time.monotonic() - started_at
+        if not acquired:
+            raise ChDBBusyError(f"chDB was busy with other queries for {timeout} seconds")
+        try:
+            with self._stats_lock:
+                self._queries += 1
+            if timeout is not None:
+                remaining = timeout - (time.monotonic() - started_at)
+                self.session.query(execution_time_setting(remaining))
+                self._limited = True
+            elif self._limited:
+                self.session.query(execution_time_setting(None))
+                self._limited = False
+            return self.session.query(sql, fmt)
+        finally:
+            self._lock.release()
+
+    def stats(self) -> dict:
+        """Get a snapshot of session usage counters."""
+        with self._stats_lock:
+            return {
+                "busy": self._lock.locked(),
+                "waiting": self._waiting,
+                "queries": self._queries,
+                "wait_seconds": self._wait_seconds,
+            }
+
+    def close(self) -> None:
+        """Close the session once the running query, if any, has finished."""
+        with self._lock:
+            self.session.close()
@@ -0,0 +1,317 @@
+"""Cache of external chDB sources in memory tables.
+
+Agents query the same file() and url() sources over and over, and chDB parses
+the file or downloads it again each time. With a byte budget, a SELECT reading
+from one of these table functions instead reads from a Memory table holding the
+source's rows, created on first use.
+
+A cached source is identified by the table function's arguments, which include
+the format, and its version: the modification time and size of a local file, or
+the ETag or Last-Modified header of a URL. A changed source is loaded again.
+Sources whose version cannot be read, such as globs or URLs without either
+header, are never cached. The least recently used tables are dropped to stay
+within the budget.
+
+A source larger than the budget, going by the file size or the Content-Length
+header, is not loaded at all, and URLs without the header are never cached.
+chDB does not enforce read limits on file() and url(), so the table of a
+compressed source can still turn out larger than the budget once loaded. It is
+then dropped, and the source is not loaded again until it changes.
+
+The tables live in a database of the Memory engine, so nothing is left behind in
+a persistent data path when the server stops. The database is created if it does
+not exist yet and never dropped, and each cache names its tables uniquely, so
+tables it did not create are left alone.
+
+Only calls in the FROM or JOIN clause of a query are replaced. String literals
+and comments are skipped, and file() used as a function reading a file into a
+string is left as it is. Queries with a SETTINGS clause are left as they are,
+since settings such as format_csv_delimiter change the rows read from a source.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_DATABASE = "mcp_source_cache"
+# Seconds to wait at most for the headers of a URL source
+URL_HEAD_TIMEOUT_SECS = 5
+
+# A table function call in the FROM or JOIN clause, matched in a masked query
+_SOURCE_FUNCTION = re.compile(r"\b(?:FROM|JOIN)\s+(file|url)\s*(?=\()", re.IGNORECASE)
+# The call's arguments, if they are all string literals
+_SOURCE_ARGUMENTS = re.compile(
+    r"\(\s*('(?:[^'\\]|\\.)*'(?:\s*,\s*'(?:[^'\\]|\\.)*')*)\s*\)"
+)
+_STRING_LITERAL = re.compile(r"'((?:[^'\\]|\\.)*)'")
+_GLOB_CHARS = ("*", "?", "{", "[")
+# Virtual columns of file() and url(), which a cached table does not have
+_VIRTUAL_COLUMN = re.compile(r"\b_(?:path|file|size|time|etag)\b")
+_READ_QUERY = re.compile(r"^\s*(?:\(\s*)*(?:SELECT|WITH)\b", re.IGNORECASE)
+# Settings of the query, which can change how a source is read
+_SETTINGS_CLAUSE = re.compile(r"\bSETTINGS\b", re.IGNORECASE)
+
+
+def _mask(query: str) -> str:
+    """Blank out the contents of string literals and comments in query.
+
+    Every other character stays where it is, so offsets into the masked query are
+    valid in query as well.
+    """
+    masked = []
+    position = 0
+    length = len(query)
+    while position < length:
+        char = query[position]
+        if char in "'\"`":
+            # A literal or quoted identifier, with backslash or doubled quote escapes
+            end = position + 1
+            while end < length:
+                if query[end] == "\\":
+                    end += 2
+                elif query[end] == char and query.startswith(char, end + 1):
+                    end += 2
+                elif query[end] == char:
+                    break
+                else:
+                    end += 1
+            closed = end < length
+            end = end + 1 if closed else length
+            if char == "'":
+                closing = "'" if closed else ""
+                masked.append("'" + " " * (end - position - 1 - len(closing)) + closing)
+            else:
+                masked.append(query[position:end])
+        elif query.startswith(("--", "# ", "#!"), position):
+            end = query.find("\n", position)
+            end = length if end < 0 else end
+            masked.append(" " * (end - position))
+        elif query.startswith("/*", position):
+            end = query.find("*/", position + 2)
+            end = length if end < 0 else end + 2
+            masked.append(" " * (end - position))
+        else:
+            end = position + 1
+            masked.append(char)
+        position = end
+    return "".join(masked)
+
+
+@dataclass
+class _CachedSource:
+    version: Hashable
+    table: str
+    size: int
+
+
+def _file_version(path: str) -> Optional[Tuple[Hashable, int]]:
+    """Get the version and size of a local file, or None if it cannot be read."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size), stat.st_size
+
+
+def _url_version(url: str, timeout: float) -> Optional[Tuple[Hashable, int]]:
+    """Get the version and size of a URL, or None if its headers do not have both."""
+    if not url.lower().startswith(("http://", "https://")):
+        return None
+    try:
+        request = urllib.request.Request(url, method="HEAD")
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            headers = response.headers
+    except Exception as e:
+        logger.debug(f"Cannot read the version of {url}: {e}")
+        return None
+    version = headers.get("ETag") or headers.get("Last-Modified")
+    length = headers.get("Content-Length")
+    if version is None or length is None or not length.isdigit():
+        return None
+    return version, int(length)
+
+
+def _source_version(
+    function: str, arguments: str, deadline: Optional[float]
+) -> Optional[Tuple[Hashable, Hashable, int]]:
+    """Get the key, version and size of a source, or None if it cannot be cached."""
+    args = tuple(_STRING_LITERAL.findall(arguments))
+    source = args[0]
+    if any(char in source for char in _GLOB_CHARS):
+        return None
+    function = function.lower()
+    if function == "file":
+        found = _file_version(source)
+    else:
+        timeout = URL_HEAD_TIMEOUT_SECS
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+        found = _url_version(source, timeout) if timeout > 0 else None
+    if found is None:
+        return None
+    return ((function, args), *found)
+
+
+class SourceCache:
+    """Caches file() and url() sources of chDB queries in Memory tables.
+
+    Args:
+        max_bytes: Maximum total size of the cached tables
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._sources: "OrderedDict[Tuple[str, Tuple[str, ...]], _CachedSource]" = OrderedDict()
+        # Sources too large to cache, by key and version
+        self._oversized: set = set()
+        self._lock = threading.Lock()
+        # Set once the cache database is known to exist, False if it cannot be used
+        self._ready: Optional[bool] = None
+        # Keeps table names apart from those of other caches in the same session
+        self._prefix = f"source_{secrets.token_hex(4)}_"
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def rewrite(
+        self,
+        query: str,
+        query_fn: Callable[[str, str], object],
+        deadline: Optional[float] = None,
+    ) -> str:
+        """Get query reading cached sources in place of file() and url() calls.
+
+        Sources that are not cached yet are loaded with query_fn, which runs SQL in
+        the chDB session in a given output format. Queries other than SELECTs, and
+        those with a SETTINGS clause or using the table functions' virtual columns,
+        are returned unchanged.
+        The headers of URL sources are not waited for past deadline, a
+        time.monotonic() value.
+        """
+        masked = _mask(query)
+        if (
+            not _READ_QUERY.match(masked)
+            or _VIRTUAL_COLUMN.search(masked)
+            or _SETTINGS_CLAUSE.search(masked)
+        ):
+            return query
+        # Versions are read before taking the lock, so that a slow URL only holds up
+        # the query reading it
+        calls = []
+        for function in _SOURCE_FUNCTION.finditer(masked):
+            arguments = _SOURCE_ARGUMENTS.match(query, function.end())
+            if arguments is None:
+                continue
+            source = _source_version(function.group(1), arguments.group(1), deadline)
+            if source is not None:
+                calls.append((function.start(1), arguments.end(), source))
+        if not calls:
+            return query
+        with self._lock:
+            if self._ready is None:
+                self._ready = self._create_database(query_fn)
+            if not self._ready:
+                return query
+            # Replaced from the end, so that earlier offsets stay valid
+            for start, end, source in reversed(calls):
+                table = self._table_for(query[start:end], *source, query_fn)
+                if table is not None:
+                    query = query[:start] + table + query[end:]
+        return query
+
+    def _create_database(self, query_fn) -> bool:
+        query_fn(f"CREATE DATABASE IF NOT EXISTS {CACHE_DATABASE} ENGINE = Memory", "CSV")
+        engine = (
+            query_fn(f"SELECT engine FROM system.databases WHERE name = '{CACHE_DATABASE}'", "CSV")
+            .data()
+            .strip()
+            .strip('"')
+        )
+        if engine != "Memory":
+            logger.warning(
+                f"Database {CACHE_DATABASE} has the {engine} engine instead of Memory, "
+                "chDB sources are not cached"
+            )
+            return False
+        return True
+
+    def _table_for(
+        self, call: str, key: Hashable, version: Hashable, source_size: int, query_fn
+    ) -> Optional[str]:
+        if (key, version) in self._oversized:
+            return None
+
+        cached = self._sources.get(key)
+        if cached is not None and cached.version == version:
+            self._sources.move_to_end(key)
+            self._hits += 1
+            return f"{CACHE_DATABASE}.{cached.table}"
+        self._misses += 1
+        if cached is not None:
+            self._drop(key, query_fn)
+        if source_size > self.max_bytes:
+            logger.info(f"chDB source {call} has {source_size} bytes, more than the cache holds")
+            self._oversized.add((key, version))
+            return None
+
+        table = self._prefix + hashlib.sha256(repr((key, version)).encode()).hexdigest()[:16]
+        try:
+            query_fn(
+                f"CREATE TABLE {CACHE_DATABASE}.{table} ENGINE = Memory AS SELECT * FROM {call}",
+                "CSV",
+            )
+            size = int(
+                query_fn(
+                    "SELECT total_bytes FROM system.tables "
+                    f"WHERE database = '{CACHE_DATABASE}' AND name = '{table}'",
+                    "CSV",
+                )
+                .data()
+                .strip()
+                or 0
+            )
+        except RuntimeError as e:
+            # The query itself reports why the source cannot be read
+            logger.debug(f"Cannot cache chDB source {call}: {e}")
+            query_fn(f"DROP TABLE IF EXISTS {CACHE_DATABASE}.{table}", "CSV")
+            return None
+        if size > self.max_bytes:
+            logger.info(f"chDB source {call} takes {size} bytes, more than the cache holds")
+            query_fn(f"DROP TABLE {CACHE_DATABASE}.{table}", "CSV")
+            self._oversized.add((key, version))
+            return None
+
+        while self._sources and self._bytes + size > self.max_bytes:
+            self._drop(next(iter(self._sources)), query_fn)
+            self._evictions += 1
+        self._sources[key] = _CachedSource(version, table, size)
+        self._bytes += size
+        return f"{CACHE_DATABASE}.{table}"
+
+    def _drop(self, key, query_fn) -> None:
+        cached = self._sources.pop(key)
+        self._bytes -= cached.size
+        query_fn(f"DROP TABLE IF EXISTS {CACHE_DATABASE}.{cached.table}", "CSV")
+
+    def stats(self) -> dict:
+        """Get a snapshot of cache usage counters."""
+        with self._lock:
+            return {
+                "sources": len(self._sources),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
@@ -0,0 +1,63 @@
+"""Entry point of chDB worker processes.
+
+Workers are started in a fresh interpreter, which imports the module of their
+entry point. This module therefore only imports chDB and the chDB helpers, and
+not the server, whose setup would delay the worker's first query.
+"""
+
+import time
+
+from mcp_clickhouse.chdb_arrow import DISABLE_COMPRESSION_SETTING, fetch_result
+from mcp_clickhouse.chdb_session import execution_time_setting
+from mcp_clickhouse.chdb_sources import SourceCache
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+def peak_memory_bytes() -> int:
+    """Get the peak resident memory of this process."""
+    if resource is None:
+        return 0
+    # Kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def worker_main(conn, data_path: str, source_cache_bytes: int) -> None:
+    """Run queries sent over conn in a chDB session until the pipe is closed."""
+    import chdb.session as chs
+
+    session = chs.Session(path=data_path)
+    session.query(DISABLE_COMPRESSION_SETTING)
+    source_cache = SourceCache(source_cache_bytes) if source_cache_bytes > 0 else None
+    try:
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                break
+            if request is None:
+                break
+            query, arrow, timeout = request
+            deadline = None if timeout is None else time.monotonic() + timeout
+
+            def query_fn(sql: str, fmt: str, deadline=deadline):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                session.query(execution_time_setting(remaining))
+                return session.query(sql, fmt)
+
+            try:
+                if source_cache is not None:
+                    query = source_cache.rewrite(query, query_fn, deadline)
+                result = fetch_result(query_fn, query, arrow)
+                # The chDB result cannot be pickled, so its buffer is sent as bytes
+                if result.column_types is not None:
+                    result.data = bytes(result.data)
+                result.owner = None
+                conn.send((result, None, peak_memory_bytes()))
+            except Exception as e:
+                conn.send((None, str(e), peak_memory_bytes()))
+    finally:
+        session.close()
@@ -0,0 +1,206 @@
+"""chDB queries in worker processes.
+
+By default chDB runs its engine inside the server process, where a heavy query
+competes with the ClickHouse tools for memory and CPU. A ChDBProcessPool instead
+runs each query in one of a few worker processes, each with a chDB session of its
+own. Results come back over a pipe as Arrow IPC streams, and are converted to
+rows in the server.
+
+A worker whose peak memory use crosses a threshold is replaced after its query,
+which returns the memory to the system. A query that overruns its timeout is
+stopped by chDB through max_execution_time, and if the worker still has not
+answered shortly after, by killing it.
+
+Each worker has its own engine, so tables created in one worker's in-memory
+session are not visible to the others. A persistent data path can only be opened
+by one process at a time, so a pool on one has a single worker.
+"""
+
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Optional
+
+from mcp_clickhouse.chdb_arrow import ChDBResult
+from mcp_clickhouse.chdb_session import ChDBBusyError
+from mcp_clickhouse.chdb_worker import worker_main
+
+logger = logging.getLogger(__name__)
+
+IN_MEMORY_DATA_PATH = ":memory:"
+# Seconds a stopping worker gets to exit before it is killed
+WORKER_STOP_TIMEOUT_SECS = 5
+# Seconds past its timeout a query gets to be stopped by chDB before its worker is killed
+WORKER_KILL_GRACE_SECS = 5
+
+
+class ChDBWorkerError(Exception):
+    """Raised when a worker process exits while running a query."""
+
+
+class ChDBWorkerTimeoutError(Exception):
+    """Raised when a query overruns its timeout, after its worker was killed."""
+
+
+class _Worker:
+    def __init__(self, context, data_path: str, source_cache_bytes: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=worker_main,
+            args=(child_conn, data_path, source_cache_bytes),
+            name="mcp-clickhouse-chdb-worker",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def run(self, query: str, arrow: bool, timeout: Optional[float]):
+        try:
+            self.conn.send((query, arrow, timeout))
+            if not self.conn.poll(None if timeout is None else timeout + WORKER_KILL_GRACE_SECS):
+                raise ChDBWorkerTimeoutError(f"chDB query timed out after {timeout} seconds")
+            return self.conn.recv()
+        except (EOFError, OSError) as e:
+            self.process.join(WORKER_STOP_TIMEOUT_SECS)
+            raise ChDBWorkerError(
+                f"chDB worker exited with code {self.process.exitcode} while running the query"
+            ) from e
+
+    def stop(self, kill: bool = False) -> None:
+        if not kill:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.process.join(WORKER_STOP_TIMEOUT_SECS)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ChDBProcessPool:
+    """Runs chDB queries in a pool of worker processes.
+
+    Workers are started when they are first needed.
+
+    Args:
+        size: Number of worker processes, forced to 1 for a persistent data path
+        data_path: chDB data path of the workers' sessions
+        max_memory_bytes: Peak memory use after which a worker is replaced, or 0
+            to never replace workers
+        source_cache_bytes: Size of each worker's cache of file() and url()
+            sources, or 0 to disable it
+    """
+
+    def __init__(
+        self, size: int, data_path: str, max_memory_bytes: int = 0, source_cache_bytes: int = 0
+    ):
+        if data_path != IN_MEMORY_DATA_PATH and size > 1:
+            logger.warning(
+                f"chDB data path {data_path} can only be opened by one process, "
+                f"using 1 chDB worker instead of {size}"
+            )
+            size = 1
+        self.size = size
+        self.data_path = data_path
+        self.max_memory_bytes = max_memory_bytes
+        self.source_cache_bytes = source_cache_bytes
+        # Workers are started in a fresh interpreter, since the server has threads
+        self._context = multiprocessing.get_context("spawn")
+        # Slots hold an idle worker, or None where a worker is yet to be started
+        self._idle: queue.Queue = queue.Queue()
+        for _ in range(size):
+            self._idle.put(None)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._queries = 0
+        self._recycled = 0
+        self._wait_seconds = 0.0
+
+    def query(
+        self, query: str, arrow: bool = True, timeout: Optional[float] = None
+    ) -> ChDBResult:
+        """Run a query in a worker, once one is free.
+
+        The timeout covers both waiting for a worker and running the query.
+
+        Raises:
+            ChDBBusyError: If no worker becomes free within the timeout
+            ChDBWorkerTimeoutError: If chDB did not stop a query overrunning the
+                timeout, and its worker was killed
+            ChDBWorkerError: If the worker exits while running the query
+            RuntimeError: If the query fails, including when chDB stops it for
+                overrunning the timeout
+        """
+        started_at = time.monotonic()
+        with self._lock:
+            self._waiting += 1
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise ChDBBusyError(f"chDB workers were busy for {timeout} seconds") from None
+        finally:
+            with self._lock:
+                self._waiting -= 1
+                self._wait_seconds += time.monotonic() - started_at
+        try:
+            if worker is None:
+                worker = _Worker(self._context, self.data_path, self.source_cache_bytes)
+            remaining = None
+            if timeout is not None:
+                remaining = max(0.0, timeout - (time.monotonic() - started_at))
+            with self._lock:
+                self._queries += 1
+            try:
+                result, error, peak_memory = worker.run(query, arrow, remaining)
+            except (ChDBWorkerTimeoutError, ChDBWorkerError):
+                worker.stop(kill=True)
+                worker = None
+                raise
+            if self.max_memory_bytes and peak_memory > self.max_memory_bytes:
+                logger.info(
+                    f"Replacing chDB worker, its peak memory use {peak_memory} bytes "
+                    f"is over {self.max_memory_bytes}"
+                )
+                worker.stop()
+                worker = None
+                with self._lock:
+                    self._recycled += 1
+        except BaseException:
+            if worker is not None:
+                worker.stop(kill=True)
+            self._idle.put(None)
+            raise
+        self._idle.put(worker)
+        if error is not None:
+            raise RuntimeError(error)
+        return result
+
+    def stats(self) -> dict:
+        """Get a snapshot of worker usage counters."""
+        with self._lock:
+            return {
+                "workers": self.size,
+                "free": self._idle.qsize(),
+                "waiting": self._waiting,
+                "queries": self._queries,
+                "recycled": self._recycled,
+                "wait_seconds": self._wait_seconds,
+            }
+
+    def close(self) -> None:
+        """Stop the idle workers.
+
+        Workers still running a query are daemon processes, which are killed when
+        the server exits.
+        """
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            if worker is not None:
+                worker.stop()
@@ -0,0 +1,281 @@
+"""Bounded pool of long-lived ClickHouse clients.
+
+Building a clickhouse_connect client is expensive: the constructor issues several
+round trips (server version, server settings, protocol negotiation) before the
+first query can run. The pool keeps initialized clients alive between tool calls
+and hands each one out to a single caller at a time, so that a streamed result
+never shares its client with another query.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import clickhouse_connect
+from clickhouse_connect.driver.exceptions import DatabaseError, OperationalError
+
+from mcp_clickhouse.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no client becomes available within the acquire timeout."""
+
+
+class PoolClosedError(Exception):
+    """Raised when acquiring from a pool that has been closed."""
+
+
+@dataclass
+class _PoolEntry:
+    client: Any
+    created_at: float
+    last_used: float
+
+
+def is_connection_error(err: BaseException) -> bool:
+    """Return True if the error means the client itself can no longer be trusted.
+
+    Errors reported by the server (bad SQL, missing tables, permissions) arrive as
+    DatabaseError and leave the connection intact. Transport failures surface as
+    OperationalError or as non-ClickHouse exceptions.
+    """
+    return isinstance(err, OperationalError) or not isinstance(err, DatabaseError)
+
+
+class ClickHousePool:
+    """A thread-safe, bounded pool of ClickHouse clients.
+
+    Clients are created lazily up to max_size. Idle clients are reused most
+    recently used first so that warm HTTP connections are preferred. A client that
+    has been idle longer than idle_check_secs is pinged before it is handed out,
+    and clients that fail the ping or raise a connection error are evicted.
+    """
+
+    def __init__(
+        self,
+        client_config: dict,
+        max_size: int = 10,
+        acquire_timeout: float = 30,
+        idle_check_secs: float = 30,
+        factory: Optional[Callable[[], Any]] = None,
+    ):
+        self._client_config = dict(client_config)
+        # Pooled clients run independent queries, so they don't need a server session.
+        # Without one, a result stream that is abandoned midway cannot leave the
+        # session locked for the next query run on the same client.
+        self._factory = factory or (
+            lambda: clickhouse_connect.get_client(
+                **self._client_config, autogenerate_session_id=False
+            )
+        )
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.idle_check_secs = idle_check_secs
+
+        self._cond = threading.Condition()
+        self._idle: List[_PoolEntry] = []
+        self._in_use: Dict[int, _PoolEntry] = {}
+        # Clients that exist or are being created, whether idle or checked out
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._created = 0
+        self._evicted = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._health_checks = 0
+        self._health_failures = 0
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Check a client out of the pool, creating one if the pool is not full.
+
+        Args:
+            timeout: Seconds to wait for a free client (defaults to acquire_timeout)
+
+        Raises:
+            PoolTimeoutError: If no client became available in time
+            PoolClosedError: If the pool has been closed
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            entry = self._checkout(deadline)
+            if entry is None:
+                entry = self._create()
+            elif not self._check_idle(entry):
+                self._discard(entry)
+                continue
+            with self._cond:
+                self._in_use[id(entry.client)] = entry
+                self._checkouts += 1
+            return entry.client
+
+    def release(self, client, broken: bool = False) -> None:
+        """Return a client to the pool, or evict it if it is broken."""
+        with self._cond:
+            entry = self._in_use.pop(id(client), None)
+            if entry is None:
+                return
+            if not broken and not self._closed:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+                self._cond.notify()
+                return
+        self._discard(entry)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Context manager that checks a client out and always gives it back.
+
+        The client is evicted instead of returned if the body raises a connection error.
+        """
+        client = self.acquire(timeout)
+        broken = False
+        try:
+            yield client
+        except BaseException as err:
+            broken = is_connection_error(err)
+            raise
+        finally:
+            self.release(client, broken=broken)
+
+    def stats(self) -> dict:
+        """Get a snapshot of pool usage counters."""
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "waiting": self._waiting,
+                "created": self._created,
+                "evicted": self._evicted,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "health_checks": self._health_checks,
+                "health_failures": self._health_failures,
+            }
+
+    def close(self) -> None:
+        """Close all idle clients. Checked out clients are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for entry in idle:
+            self._discard(entry)
+
+    def _checkout(self, deadline: float) -> Optional[_PoolEntry]:
+        """Pop an idle entry, or reserve a slot for a new client (returns None)."""
+        with self._cond:
+            waited = False
+            while True:
+                if self._closed:
+                    raise PoolClosedError("ClickHouse client pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No ClickHouse client available (pool size {self.max_size})"
+                    )
+                if not waited:
+                    self._waits += 1
+                    waited = True
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _create(self) -> _PoolEntry:
+        try:
+            host = self._client_config.get("host")
+            with span("clickhouse.pool.create_client", **{"server.address": host}):
+                client = self._factory()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        now = time.monotonic()
+        with self._cond:
+            self._created += 1
+        logger.info(f"Created pooled ClickHouse client ({self._size}/{self.max_size})")
+        return _PoolEntry(client=client, created_at=now, last_used=now)
+
+    def _check_idle(self, entry: _PoolEntry) -> bool:
+        """Ping a client that has been idle for too long before reusing it."""
+        if time.monotonic() - entry.last_used < self.idle_check_secs:
+            return True
+        with self._cond:
+            self._health_checks += 1
+        try:
+            healthy = bool(entry.client.ping())
+        except Exception:
+            healthy = False
+        if not healthy:
+            logger.warning("Evicting pooled ClickHouse client that failed its idle health check")
+            with self._cond:
+                self._health_failures += 1
+        return healthy
+
+    def _discard(self, entry: _PoolEntry) -> None:
+        with self._cond:
+            self._size -= 1
+            self._evicted += 1
+            self._cond.notify()
+        try:
+            entry.client.close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled ClickHouse client: {e}")
+
+
+_POOLS: Dict[Tuple, ClickHousePool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(client_config: dict, **pool_options) -> ClickHousePool:
+    """Get the pool for a client configuration, creating it on first use.
+
+    Pools are keyed by the full client configuration, so a change in host,
+    credentials or timeouts results in a separate set of clients.
+    """
+    key = tuple(sorted(client_config.items()))
+    pool = _POOLS.get(key)
+    if pool is not None:
+        return pool
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = ClickHousePool(client_config, **pool_options)
+            _POOLS[key] = pool
+        return pool
+
+
+def get_pool_stats() -> List[dict]:
+    """Get statistics for every pool, tagged with the host it connects to."""
+    return [
+        {"host": pool._client_config.get("host"), **pool.stats()} for pool in list(_POOLS.values())
+    ]
+
+
+def close_all_pools() -> None:
+    """Close and forget every pool."""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,163 @@
+"""Server-side cursors for paginated SELECT results.
+
+A cursor keeps a pooled ClickHouse client and an open row block stream between
+tool calls, so large results are read from the server one page at a time instead
+of being loaded into memory all at once.
+"""
+
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCursor:
+    """An open row stream for one query, read page by page.
+
+    Args:
+        client: The client running the query, checked out of its pool
+        stream: An entered StreamContext from client.query_row_block_stream()
+        query_id: The server-side query id, used to kill abandoned queries
+        page_size: Default number of rows returned per page
+        on_close: Called with (cursor, finished) when the cursor is closed
+        result_format: Layout of the returned pages ("rows", "columns" or "records")
+    """
+
+    def __init__(
+        self,
+        client,
+        stream,
+        query_id: str,
+        page_size: int,
+        on_close: Callable[[object, bool], None],
+        result_format: str = "rows",
+    ):
+        self.client = client
+        self.query_id = query_id
+        self.column_names = stream.source.column_names
+        self.page_size = page_size
+        self.result_format = result_format
+        # Reentrant so a cursor can be closed from inside a locked fetch
+        self.lock = threading.RLock()
+        self.last_used = time.monotonic()
+        self._stream = stream
+        self._on_close = on_close
+        self._block: List = []
+        self._offset = 0
+        self._finished = False
+        self._closed = False
+
+    @property
+    def finished(self) -> bool:
+        """Whether every row of the result has been read."""
+        return self._finished and self._offset >= len(self._block)
+
+    def fetch(self, page_size: Optional[int] = None) -> List:
+        """Read up to page_size rows, pulling new blocks from the server as needed.
+
+        Reads one block ahead once the page is full, so that finished is accurate
+        as soon as the last row has been returned.
+        """
+        page_size = page_size or self.page_size
+        self.last_used = time.monotonic()
+        rows = []
+        while len(rows) < page_size and self._fill():
+            take = self._block[self._offset : self._offset + page_size - len(rows)]
+            rows.extend(take)
+            self._offset += len(take)
+        self._fill()
+        return rows
+
+    def _fill(self) -> bool:
+        """Make sure there are buffered rows; return False once the stream is exhausted."""
+        while self._offset >= len(self._block):
+            if self._finished:
+                return False
+            try:
+                self._block = next(self._stream)
+            except StopIteration:
+                self._finished = True
+                self._block = []
+            self._offset = 0
+        return True
+
+    def close(self) -> None:
+        """Close the stream and hand the client back through on_close."""
+        with self.lock:
+            if self._closed:
+                return
+            self._closed = True
+            finished = self.finished
+            try:
+                self._stream.__exit__(None, None, None)
+            except Exception as e:
+                logger.warning(f"Error closing result stream for query {self.query_id}: {e}")
+        self._on_close(self, finished)
+
+
+class CursorRegistry:
+    """Open cursors addressed by opaque tokens.
+
+    Cursors that are not read for ttl seconds are closed, and when more than
+    max_open cursors are open the least recently used one is closed.
+    """
+
+    def __init__(self, ttl: float = 300, max_open: int = 10):
+        self.ttl = ttl
+        self.max_open = max_open
+        self._cursors: "OrderedDict[str, QueryCursor]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, cursor: QueryCursor) -> str:
+        """Store a cursor and return the token that refers to it."""
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            self._cursors[token] = cursor
+            evicted = self._collect_expired()
+            while len(self._cursors) > self.max_open:
+                _, oldest = self._cursors.popitem(last=False)
+                evicted.append(oldest)
+        self._close_all(evicted)
+        return token
+
+    def get(self, token: str) -> Optional[QueryCursor]:
+        """Get an open cursor by token, or None if it is unknown or expired."""
+        with self._lock:
+            expired = self._collect_expired()
+            cursor = self._cursors.get(token)
+            if cursor is not None:
+                self._cursors.move_to_end(token)
+        self._close_all(expired)
+        return cursor
+
+    def remove(self, token: str) -> None:
+        """Forget a cursor and close it."""
+        with self._lock:
+            cursor = self._cursors.pop(token, None)
+        if cursor is not None:
+            cursor.close()
+
+    def close_all(self) -> None:
+        """Close every open cursor."""
+        with self._lock:
+            cursors = list(self._cursors.values())
+            self._cursors.clear()
+        self._close_all(cursors)
+
+    def __len__(self) -> int:
+        return len(self._cursors)
+
+    def _collect_expired(self) -> List[QueryCursor]:
+        deadline = time.monotonic() - self.ttl
+        expired = [token for token, c in self._cursors.items() if c.last_used < deadline]
+        return [self._cursors.pop(token) for token in expired]
+
+    @staticmethod
+    def _close_all(cursors: List[QueryCursor]) -> None:
+        for cursor in cursors:
+            logger.info(f"Closing cursor for query {cursor.query_id}")
+            cursor.close()
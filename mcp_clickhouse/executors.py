@@ -0,0 +1,56 @@
+"""Separate thread pools for each class of blocking work.
+
+Slow analytical queries, cheap metadata lookups, chDB queries and health probes
+each run on their own pool, so that a pool saturated by one class of work never
+delays another. A health probe in particular still answers while every query
+thread is busy.
+"""
+
+import concurrent.futures
+import threading
+
+
+class ExecutorPool:
+    """A named thread pool that counts the work it is running.
+
+    Args:
+        name: Pool name, used in thread names and metrics
+        max_workers: Number of threads
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"mcp-clickhouse-{name}"
+        )
+        self._lock = threading.Lock()
+        self._active = 0
+
+    def submit(self, func, *args) -> concurrent.futures.Future:
+        """Schedule func(*args) on the pool."""
+        return self._executor.submit(self._run, func, *args)
+
+    def stats(self) -> dict:
+        """Get a snapshot of the pool's running and waiting work."""
+        with self._lock:
+            active = self._active
+        return {
+            "active": active,
+            # Cancelled work stays in the queue until a thread picks it up
+            "queued": self._executor._work_queue.qsize(),
+            "max_workers": self.max_workers,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, func, *args):
+        with self._lock:
+            self._active += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._active -= 1
+
@@ -0,0 +1,117 @@
+"""Arrow IPC and Parquet exports of query results.
+
+Large analytical results are streamed from ClickHouse as Arrow record batches and
+written straight to a spill file, without converting values to Python objects.
+The tool response only carries the file path, schema and row count, and other
+tools can memory-map the file to read it without copying.
+"""
+
+import logging
+import os
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("arrow", "parquet")
+EXPORT_FILE_PREFIX = "mcp-clickhouse-"
+_EXTENSIONS = {"arrow": ".arrow", "parquet": ".parquet"}
+
+
+class ExportUnavailableError(Exception):
+    """Raised when pyarrow, which exports are written with, is not installed."""
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError as e:
+        raise ExportUnavailableError(
+            "Result export requires the pyarrow package (pip install pyarrow)"
+        ) from e
+    return pyarrow
+
+
+def new_export_path(directory: str, export_format: str) -> str:
+    """Get a unique file path for a new export in directory, creating it if needed."""
+    os.makedirs(directory, exist_ok=True)
+    name = f"{EXPORT_FILE_PREFIX}{uuid.uuid4().hex}{_EXTENSIONS[export_format]}"
+    return os.path.join(directory, name)
+
+
+def remove_expired_exports(directory: str, ttl: float) -> int:
+    """Delete export files in directory that are older than ttl seconds.
+
+    Returns:
+        The number of files removed
+    """
+    if not os.path.isdir(directory):
+        return 0
+    deadline = time.time() - ttl
+    removed = 0
+    for entry in os.scandir(directory):
+        if not entry.name.startswith(EXPORT_FILE_PREFIX) or not entry.is_file():
+            continue
+        try:
+            if entry.stat().st_mtime < deadline:
+                os.remove(entry.path)
+                removed += 1
+        except OSError as e:
+            logger.warning(f"Could not remove expired export {entry.path}: {e}")
+    if removed:
+        logger.info(f"Removed {removed} expired result exports from {directory}")
+    return removed
+
+
+def write_export(stream, path: str, export_format: str, max_bytes: int = 0) -> dict:
+    """Write an Arrow batch stream to an Arrow IPC file or a Parquet file.
+
+    Args:
+        stream: An entered StreamContext from client.query_arrow_stream()
+        path: File to write
+        export_format: "arrow" (Arrow IPC file format) or "parquet"
+        max_bytes: Stop once this many bytes of Arrow data were written, 0 for no limit
+
+    Returns:
+        The export metadata: path, format, schema, row count, file size and
+        whether the result was truncated
+    """
+    pyarrow = _import_pyarrow()
+    schema = stream.gen.schema
+    if export_format == "parquet":
+        import pyarrow.parquet
+
+        writer = pyarrow.parquet.ParquetWriter(path, schema)
+    else:
+        writer = pyarrow.ipc.new_file(path, schema)
+
+    row_count = 0
+    written_bytes = 0
+    truncated = False
+    try:
+        for batch in stream:
+            if max_bytes and written_bytes + batch.nbytes > max_bytes:
+                truncated = True
+                break
+            if export_format == "parquet":
+                writer.write_batch(batch)
+            else:
+                writer.write(batch)
+            row_count += batch.num_rows
+            written_bytes += batch.nbytes
+    except BaseException:
+        writer.close()
+        os.remove(path)
+        raise
+    writer.close()
+
+    return {
+        "format": export_format,
+        "path": path,
+        "schema": [{"name": f.name, "type": str(f.type)} for f in schema],
+        "row_count": row_count,
+        "bytes": os.path.getsize(path),
+        "truncated": truncated,
+    }
+
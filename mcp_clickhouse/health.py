@@ -0,0 +1,60 @@
+"""Cached health probes.
+
+Orchestrators probe the server every few seconds, often several at once. The
+ClickHouse probe runs at most once per ttl seconds, and every probe in that window
+is answered with its cached result.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+@dataclass(frozen=True)
+class HealthStatus:
+    healthy: bool
+    message: str
+    # time.monotonic() when the probe finished
+    checked_at: float
+
+
+class HealthCheck:
+    """Runs a probe at most once per ttl seconds and shares its result.
+
+    Args:
+        probe: Blocking function that returns a status message, or raises if unhealthy
+        ttl: Seconds a result is reused
+    """
+
+    def __init__(self, probe: Callable[[], str], ttl: float):
+        self.probe = probe
+        self.ttl = ttl
+        self._status: Optional[HealthStatus] = None
+        self._lock = threading.Lock()
+
+    def cached(self) -> Optional[HealthStatus]:
+        """Get the last result if it is still fresh, without probing."""
+        status = self._status
+        if status is not None and time.monotonic() - status.checked_at < self.ttl:
+            return status
+        return None
+
+    def status(self) -> HealthStatus:
+        """Get a fresh result, probing if the cached one is stale.
+
+        Concurrent callers wait for a single probe instead of each running their own.
+        """
+        with self._lock:
+            status = self.cached()
+            if status is None:
+                try:
+                    status = HealthStatus(True, self.probe(), time.monotonic())
+                except Exception as e:
+                    status = HealthStatus(False, str(e), time.monotonic())
+                self._status = status
+            return status
+
+    def clear(self) -> None:
+        """Forget the cached result, so the next status() call probes again."""
+        self._status = None
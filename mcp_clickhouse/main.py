@@ -1,8 +1,43 @@
-from .mcp_server import mcp
+import uvicorn
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+
 from .mcp_env import get_config, TransportType
 
+# Responses smaller than this are sent uncompressed, as compressing them saves little
+COMPRESSION_MINIMUM_SIZE = 1024
+
+
+def http_middleware() -> list:
+    """Get the Starlette middleware of the HTTP and SSE transports."""
+    middleware = []
+    if get_config().mcp_compression == "gzip":
+        # zlib's default level: most of the size reduction of level 9 at a fraction
+        # of the CPU cost on large JSON results
+        middleware.append(
+            Middleware(GZipMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE, compresslevel=6)
+        )
+    return middleware
+
+
+def http_app(mcp, transport: str):
+    """Get the Starlette app of the HTTP or SSE transport."""
+    if transport == TransportType.SSE.value:
+        return mcp.http_app(transport="sse", middleware=http_middleware())
+    # Streamed responses are text/event-stream, which GZipMiddleware never compresses,
+    # so tool results are sent as plain JSON responses when compression is enabled
+    return mcp.http_app(
+        transport="http",
+        middleware=http_middleware(),
+        json_response=get_config().mcp_compression == "gzip",
+    )
+
 
 def main():
+    # Imported here rather than at the top, since chDB worker processes import the
+    # main module again and must not set up the server
+    from .mcp_server import mcp
+
     config = get_config()
     transport = config.mcp_server_transport
 
@@ -11,7 +46,13 @@ def main():
     if transport in http_transports:
         # Use the configured bind host (defaults to 127.0.0.1, can be set to 0.0.0.0)
         # and bind port (defaults to 8000)
-        mcp.run(transport=transport, host=config.mcp_bind_host, port=config.mcp_bind_port)
+        uvicorn.run(
+            http_app(mcp, transport),
+            host=config.mcp_bind_host,
+            port=config.mcp_bind_port,
+            timeout_graceful_shutdown=0,
+            lifespan="on",
+        )
     else:
         # For stdio transport, no host or port is needed
         mcp.run(transport=transport)
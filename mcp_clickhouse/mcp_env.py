@@ -6,9 +6,16 @@ and type conversion.
 
 from dataclasses import dataclass
 import os
-from typing import Optional
+import tempfile
+from typing import Optional, Union
 from enum import Enum
 
+# Result compression methods supported by clickhouse-connect
+CLICKHOUSE_COMPRESSION_METHODS = ("lz4", "zstd", "gzip", "br")
+# A chDB worker takes about 400 MiB before its first query, so a lower memory limit
+# would replace it after every query
+MIN_CHDB_WORKER_MEMORY_MB = 1024
+
 
 class TransportType(str, Enum):
     """Supported MCP server transport types."""
@@ -42,11 +49,39 @@ class ClickHouseConfig:
         CLICKHOUSE_CONNECT_TIMEOUT: Connection timeout in seconds (default: 30)
         CLICKHOUSE_SEND_RECEIVE_TIMEOUT: Send/receive timeout in seconds (default: 300)
         CLICKHOUSE_DATABASE: Default database to use (default: None)
+        CLICKHOUSE_COMPRESS: Compression of query results, "true", "false", "lz4", "zstd", "gzip" or "br" (default: true)
         CLICKHOUSE_PROXY_PATH: Path to be added to the host URL. For instance, for servers behind an HTTP proxy (default: None)
         CLICKHOUSE_MCP_SERVER_TRANSPORT: MCP server transport method - "stdio", "http", or "sse" (default: stdio)
         CLICKHOUSE_MCP_BIND_HOST: Host to bind the MCP server to when using HTTP or SSE transport (default: 127.0.0.1)
         CLICKHOUSE_MCP_BIND_PORT: Port to bind the MCP server to when using HTTP or SSE transport (default: 8000)
+        CLICKHOUSE_MCP_COMPRESSION: Compression of HTTP and SSE transport responses, "gzip" or "none" (default: gzip)
         CLICKHOUSE_ENABLED: Enable ClickHouse server (default: true)
+        CLICKHOUSE_METADATA_THREAD_POOL_SIZE: Threads for metadata lookups and query cancellation (default: 4)
+        CLICKHOUSE_HEALTH_THREAD_POOL_SIZE: Threads for health checks (default: 2)
+        CLICKHOUSE_HEALTH_CACHE_SECS: Seconds a health check result is reused (default: 5)
+        CLICKHOUSE_POOL_SIZE: Maximum number of pooled ClickHouse clients (default: combined size of the thread pools plus CLICKHOUSE_CURSOR_MAX_OPEN)
+        CLICKHOUSE_POOL_ACQUIRE_TIMEOUT: Seconds to wait for a free pooled client (default: 30)
+        CLICKHOUSE_POOL_IDLE_CHECK_SECS: Idle time after which a pooled client is pinged before reuse (default: 30)
+        CLICKHOUSE_CURSOR_TTL_SECS: Idle time after which a paginated query cursor is closed (default: 300)
+        CLICKHOUSE_CURSOR_MAX_OPEN: Maximum number of open paginated query cursors (default: 10)
+        CLICKHOUSE_MAX_RESULT_ROWS: Maximum number of rows returned by a query, 0 for no limit (default: 100000)
+        CLICKHOUSE_MAX_RESULT_BYTES: Maximum result size in bytes, 0 for no limit (default: 10485760)
+        CLICKHOUSE_RESULT_OVERFLOW_MODE: What the server does when the row limit is hit, "break" or "throw" (default: break)
+        CLICKHOUSE_COLUMNAR_THRESHOLD_ROWS: Row count from which results default to the columnar format, 0 to never switch (default: 1000)
+        CLICKHOUSE_EXPORT_DIR: Directory that Arrow and Parquet result exports are written to (default: <temp dir>/mcp-clickhouse-exports)
+        CLICKHOUSE_EXPORT_TTL_SECS: Age after which export files are deleted (default: 3600)
+        CLICKHOUSE_EXPORT_MAX_BYTES: Maximum Arrow data size of one export, 0 for no limit (default: 1073741824)
+        CLICKHOUSE_METADATA_CACHE_TTL_SECS: Seconds cached database and table metadata is served without revalidation (default: 60)
+        CLICKHOUSE_METADATA_CACHE_MAX_ENTRIES: Maximum number of cached metadata lookups, 0 to disable the cache (default: 256)
+        CLICKHOUSE_RESULT_CACHE_ENABLED: Cache the results of identical deterministic SELECT queries (default: false)
+        CLICKHOUSE_RESULT_CACHE_TTL_SECS: Seconds a cached query result is reused (default: 30)
+        CLICKHOUSE_RESULT_CACHE_MAX_BYTES: Estimated size budget of the result cache in bytes (default: 67108864)
+        CLICKHOUSE_CAPABILITIES_REFRESH_SECS: Seconds the server's readonly level and changeable settings are cached (default: 300)
+        CLICKHOUSE_MAX_CONCURRENT_QUERIES: Maximum number of tool calls running at once (default: thread pool size)
+        CLICKHOUSE_MAX_QUEUED_QUERIES: Maximum number of tool calls waiting to run before new ones are rejected (default: 100)
+        CLICKHOUSE_MAX_CONCURRENT_QUERIES_PER_CLIENT: Maximum number of tool calls running at once per client, 0 for no limit (default: 0)
+        CLICKHOUSE_MAX_QUEUED_QUERIES_PER_CLIENT: Maximum number of tool calls waiting per client, 0 for no limit (default: 0)
+        CLICKHOUSE_CLIENT_WEIGHTS: Fair queuing weights as comma-separated client=weight pairs (default: none)
     """
 
     def __init__(self):
@@ -125,6 +160,23 @@ class ClickHouseConfig:
         """
         return int(os.getenv("CLICKHOUSE_SEND_RECEIVE_TIMEOUT", "300"))
 
+    @property
+    def compress(self) -> Union[bool, str]:
+        """Get the compression of query results sent by ClickHouse.
+
+        Valid options: "true" (negotiate, preferring lz4), "false", "lz4", "zstd",
+        "gzip", "br" (requires the brotli package)
+        Default: "true"
+        """
+        value = os.getenv("CLICKHOUSE_COMPRESS", "true").lower()
+        if value in ("true", "false"):
+            return value == "true"
+        if value not in CLICKHOUSE_COMPRESSION_METHODS:
+            methods = ("true", "false") + CLICKHOUSE_COMPRESSION_METHODS
+            valid_options = ", ".join(f'"{m}"' for m in methods)
+            raise ValueError(f"Invalid compression '{value}'. Valid options: {valid_options}")
+        return value
+
     @property
     def proxy_path(self) -> str:
         return os.getenv("CLICKHOUSE_PROXY_PATH")
@@ -162,6 +214,20 @@ class ClickHouseConfig:
         """
         return int(os.getenv("CLICKHOUSE_MCP_BIND_PORT", "8000"))
 
+    @property
+    def mcp_compression(self) -> str:
+        """Get the compression of HTTP and SSE transport responses.
+
+        Responses are only compressed for clients that accept the encoding.
+        Server-sent event streams are never compressed.
+        Valid options: "gzip", "none"
+        Default: "gzip"
+        """
+        value = os.getenv("CLICKHOUSE_MCP_COMPRESSION", "gzip").lower()
+        if value not in ("gzip", "none"):
+            raise ValueError(f"Invalid MCP compression '{value}'. Valid options: \"gzip\", \"none\"")
+        return value
+
     @property
     def thread_pool_size(self) -> int:
         """Get the thread pool size for concurrent query execution.
@@ -172,6 +238,271 @@ class ClickHouseConfig:
         """
         return int(os.getenv("CLICKHOUSE_THREAD_POOL_SIZE", "30"))
 
+    @property
+    def metadata_thread_pool_size(self) -> int:
+        """Get the thread pool size for metadata lookups and query cancellation.
+
+        These run apart from SELECT queries, so they never wait behind slow queries.
+        Default: 4
+        """
+        return int(os.getenv("CLICKHOUSE_METADATA_THREAD_POOL_SIZE", "4"))
+
+    @property
+    def health_thread_pool_size(self) -> int:
+        """Get the thread pool size for health checks.
+
+        Default: 2
+        """
+        return int(os.getenv("CLICKHOUSE_HEALTH_THREAD_POOL_SIZE", "2"))
+
+    @property
+    def health_cache_secs(self) -> float:
+        """Get how long a health check result is reused, in seconds.
+
+        Probes within this window are answered without contacting ClickHouse.
+        Default: 5
+        """
+        return float(os.getenv("CLICKHOUSE_HEALTH_CACHE_SECS", "5"))
+
+    @property
+    def pool_size(self) -> int:
+        """Get the maximum number of pooled ClickHouse clients.
+
+        Each running query, metadata lookup, health check or open query cursor holds
+        one client, so this defaults to the combined size of the query, metadata and
+        health thread pools plus the maximum number of open cursors.
+        """
+        if "CLICKHOUSE_POOL_SIZE" in os.environ:
+            return int(os.environ["CLICKHOUSE_POOL_SIZE"])
+        return (
+            self.thread_pool_size
+            + self.metadata_thread_pool_size
+            + self.health_thread_pool_size
+            + self.cursor_max_open
+        )
+
+    @property
+    def pool_acquire_timeout(self) -> float:
+        """Get how long to wait for a free pooled client, in seconds.
+
+        Default: 30
+        """
+        return float(os.getenv("CLICKHOUSE_POOL_ACQUIRE_TIMEOUT", "30"))
+
+    @property
+    def pool_idle_check_secs(self) -> float:
+        """Get the idle time after which a pooled client is pinged before reuse.
+
+        Default: 30
+        """
+        return float(os.getenv("CLICKHOUSE_POOL_IDLE_CHECK_SECS", "30"))
+
+    @property
+    def cursor_ttl_secs(self) -> float:
+        """Get the idle time after which a paginated query cursor is closed.
+
+        An open cursor holds a pooled client and a running query on the server.
+        Default: 300
+        """
+        return float(os.getenv("CLICKHOUSE_CURSOR_TTL_SECS", "300"))
+
+    @property
+    def cursor_max_open(self) -> int:
+        """Get the maximum number of open paginated query cursors.
+
+        When the limit is reached, the least recently used cursor is closed.
+        Default: 10
+        """
+        return int(os.getenv("CLICKHOUSE_CURSOR_MAX_OPEN", "10"))
+
+    @property
+    def max_result_rows(self) -> int:
+        """Get the maximum number of rows returned by a query.
+
+        Sent to the server as max_result_rows, with one row to spare so that a
+        result the server cuts off is reported as truncated, and enforced again
+        while reading the result. 0 disables the limit.
+        Default: 100000
+        """
+        return int(os.getenv("CLICKHOUSE_MAX_RESULT_ROWS", "100000"))
+
+    @property
+    def max_result_bytes(self) -> int:
+        """Get the maximum size of a query result in bytes.
+
+        The serialized size of the rows is counted while reading the result. Not
+        sent to the server, which counts the size of the result in memory instead.
+        0 disables the limit.
+        Default: 10485760 (10 MiB)
+        """
+        return int(os.getenv("CLICKHOUSE_MAX_RESULT_BYTES", "10485760"))
+
+    @property
+    def result_overflow_mode(self) -> str:
+        """Get what the server does when the row limit is exceeded.
+
+        Valid options: "break" (return a partial result), "throw" (fail the query)
+        Default: "break"
+        """
+        mode = os.getenv("CLICKHOUSE_RESULT_OVERFLOW_MODE", "break").lower()
+        if mode not in ("break", "throw"):
+            raise ValueError(f"Invalid result overflow mode '{mode}'. Valid options: \"break\", \"throw\"")
+        return mode
+
+    @property
+    def columnar_threshold_rows(self) -> int:
+        """Get the row count from which query results default to the columnar format.
+
+        Only applies when the caller does not ask for a format. 0 keeps row tuples
+        for every result.
+        Default: 1000
+        """
+        return int(os.getenv("CLICKHOUSE_COLUMNAR_THRESHOLD_ROWS", "1000"))
+
+    @property
+    def export_dir(self) -> str:
+        """Get the directory that Arrow and Parquet result exports are written to.
+
+        Default: "mcp-clickhouse-exports" in the system temp directory
+        """
+        return os.getenv(
+            "CLICKHOUSE_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "mcp-clickhouse-exports")
+        )
+
+    @property
+    def export_ttl_secs(self) -> int:
+        """Get the age in seconds after which export files are deleted.
+
+        Expired files are removed whenever a new export is written.
+        Default: 3600
+        """
+        return int(os.getenv("CLICKHOUSE_EXPORT_TTL_SECS", "3600"))
+
+    @property
+    def export_max_bytes(self) -> int:
+        """Get the maximum size of the Arrow data written by one export.
+
+        Exports are not subject to the result row and byte limits, so this bounds
+        the disk space a single export can use. 0 disables the limit.
+        Default: 1073741824 (1 GiB)
+        """
+        return int(os.getenv("CLICKHOUSE_EXPORT_MAX_BYTES", "1073741824"))
+
+    @property
+    def metadata_cache_ttl_secs(self) -> float:
+        """Get the time cached database and table metadata is served without revalidation.
+
+        After that, cached results are reused only if a fingerprint of the
+        underlying metadata (names, count, latest metadata_modification_time and
+        total rows and bytes) is unchanged.
+        Default: 60
+        """
+        return float(os.getenv("CLICKHOUSE_METADATA_CACHE_TTL_SECS", "60"))
+
+    @property
+    def metadata_cache_max_entries(self) -> int:
+        """Get the maximum number of cached list_databases, list_tables and describe_table results.
+
+        The least recently used entries are evicted first. 0 disables the cache.
+        Default: 256
+        """
+        return int(os.getenv("CLICKHOUSE_METADATA_CACHE_MAX_ENTRIES", "256"))
+
+    @property
+    def result_cache_enabled(self) -> bool:
+        """Get whether results of identical SELECT queries are cached.
+
+        Queries calling non-deterministic functions such as now() or rand(), or
+        reading system tables, are never cached.
+        Default: False
+        """
+        return os.getenv("CLICKHOUSE_RESULT_CACHE_ENABLED", "false").lower() == "true"
+
+    @property
+    def result_cache_ttl_secs(self) -> float:
+        """Get the time in seconds a cached query result is reused.
+
+        Default: 30
+        """
+        return float(os.getenv("CLICKHOUSE_RESULT_CACHE_TTL_SECS", "30"))
+
+    @property
+    def result_cache_max_bytes(self) -> int:
+        """Get the size budget of the result cache, from the estimated JSON size of the rows.
+
+        The least recently used results are evicted once the budget is exceeded.
+        Default: 67108864 (64 MiB)
+        """
+        return int(os.getenv("CLICKHOUSE_RESULT_CACHE_MAX_BYTES", "67108864"))
+
+    @property
+    def capabilities_refresh_secs(self) -> float:
+        """Get how long the server's readonly level and changeable settings are cached.
+
+        They are read from system.settings once per process and refreshed after
+        this many seconds.
+        Default: 300
+        """
+        return float(os.getenv("CLICKHOUSE_CAPABILITIES_REFRESH_SECS", "300"))
+
+    @property
+    def max_concurrent_queries(self) -> int:
+        """Get the maximum number of tool calls admitted to run at once.
+
+        Defaults to the thread pool size, so that admitted work never waits for a thread.
+        """
+        if "CLICKHOUSE_MAX_CONCURRENT_QUERIES" in os.environ:
+            return int(os.environ["CLICKHOUSE_MAX_CONCURRENT_QUERIES"])
+        return self.thread_pool_size
+
+    @property
+    def max_queued_queries(self) -> int:
+        """Get the maximum number of tool calls waiting for admission.
+
+        Calls beyond this are rejected immediately with a "server busy" error.
+        Default: 100
+        """
+        return int(os.getenv("CLICKHOUSE_MAX_QUEUED_QUERIES", "100"))
+
+    @property
+    def max_concurrent_queries_per_client(self) -> int:
+        """Get the maximum number of tool calls one client may run at once.
+
+        Clients are told apart by API key (the X-API-Key or Authorization header)
+        or else by MCP session. 0 disables the limit.
+        Default: 0
+        """
+        return int(os.getenv("CLICKHOUSE_MAX_CONCURRENT_QUERIES_PER_CLIENT", "0"))
+
+    @property
+    def max_queued_queries_per_client(self) -> int:
+        """Get the maximum number of tool calls one client may have waiting.
+
+        0 disables the limit.
+        Default: 0
+        """
+        return int(os.getenv("CLICKHOUSE_MAX_QUEUED_QUERIES_PER_CLIENT", "0"))
+
+    @property
+    def client_weights(self) -> dict:
+        """Get the weighted fair queuing weight of each client.
+
+        Format: comma-separated client=weight pairs, where client is a client id as
+        reported in the logs. Clients that are not listed have weight 1.
+        Default: no weights
+        """
+        weights = {}
+        for pair in os.getenv("CLICKHOUSE_CLIENT_WEIGHTS", "").split(","):
+            if not pair.strip():
+                continue
+            client, sep, weight = pair.rpartition("=")
+            if not sep or not client.strip() or float(weight) <= 0:
+                raise ValueError(
+                    f"Invalid client weight '{pair}'. Expected client=weight with a positive weight"
+                )
+            weights[client.strip()] = float(weight)
+        return weights
+
     def get_client_config(self) -> dict:
         """Get the configuration dictionary for clickhouse_connect client.
 
@@ -188,6 +519,7 @@ class ClickHouseConfig:
             "connect_timeout": self.connect_timeout,
             "send_receive_timeout": self.send_receive_timeout,
             "client_name": "mcp_clickhouse",
+            "compress": self.compress,
         }
 
         # Add optional database if set
@@ -223,6 +555,15 @@ class ChDBConfig:
 
     Required environment variables:
         CHDB_DATA_PATH: The path to the chDB data directory (only required if CHDB_ENABLED=true)
+
+    Optional environment variables (with defaults):
+        CHDB_THREAD_POOL_SIZE: Threads for chDB queries (default: 4)
+        CHDB_PROCESS_POOL_SIZE: Worker processes for chDB queries, 0 to run chDB in the
+            server process (default: 0)
+        CHDB_WORKER_MAX_MEMORY_MB: Peak memory use after which a worker process is
+            replaced, 0 to never replace workers (default: 4096)
+        CHDB_SOURCE_CACHE_MAX_MB: Memory for caching file() and url() sources in
+            tables, 0 to disable the cache (default: 0)
     """
 
     def __init__(self):
@@ -243,6 +584,54 @@ class ChDBConfig:
         """Get the chDB data path."""
         return os.getenv("CHDB_DATA_PATH", ":memory:")
 
+    @property
+    def thread_pool_size(self) -> int:
+        """Get the thread pool size for chDB queries.
+
+        chDB runs in-process, so its queries use a pool of their own instead of
+        taking threads from ClickHouse queries.
+        Default: 4
+        """
+        return int(os.getenv("CHDB_THREAD_POOL_SIZE", "4"))
+
+    @property
+    def process_pool_size(self) -> int:
+        """Get the number of worker processes running chDB queries.
+
+        With 0, chDB runs in the server process. Otherwise each worker has a chDB
+        engine of its own, so a heavy query cannot take memory or CPU from the
+        ClickHouse tools.
+        Default: 0
+        """
+        return int(os.getenv("CHDB_PROCESS_POOL_SIZE", "0"))
+
+    @property
+    def worker_max_memory_mb(self) -> int:
+        """Get the peak memory use in MiB after which a chDB worker is replaced.
+
+        0 never replaces workers. Otherwise at least MIN_CHDB_WORKER_MEMORY_MB,
+        since a worker takes about 400 MiB before running any query.
+        Default: 4096
+        """
+        value = int(os.getenv("CHDB_WORKER_MAX_MEMORY_MB", "4096"))
+        if 0 < value < MIN_CHDB_WORKER_MEMORY_MB:
+            raise ValueError(
+                f"Invalid chDB worker memory limit {value} MiB. "
+                f"Expected 0 or at least {MIN_CHDB_WORKER_MEMORY_MB} MiB"
+            )
+        return value
+
+    @property
+    def source_cache_max_mb(self) -> int:
+        """Get the memory in MiB for caching file() and url() sources in tables.
+
+        Repeated queries of a cached source read its rows from a Memory table
+        instead of parsing the file or downloading it again. In worker process mode,
+        each worker has a cache of this size. 0 disables the cache.
+        Default: 0
+        """
+        return int(os.getenv("CHDB_SOURCE_CACHE_MAX_MB", "0"))
+
     def get_client_config(self) -> dict:
         """Get the configuration dictionary for chDB client.
 
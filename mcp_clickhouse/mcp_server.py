@@ -1,9 +1,15 @@
+import asyncio
 import logging
 import json
-from typing import Optional, List, Any
-import concurrent.futures
+from typing import Optional, List
+import contextvars
 import atexit
+import hashlib
 import os
+import time
+import uuid
+from contextlib import contextmanager
+from functools import cache, partial, wraps
 
 import clickhouse_connect
 import chdb.session as chs
@@ -13,15 +19,61 @@ from fastmcp import FastMCP
 from fastmcp.tools import Tool
 from fastmcp.prompts import Prompt
 from fastmcp.exceptions import ToolError
-from dataclasses import dataclass, field, asdict, is_dataclass
+from fastmcp.server.dependencies import get_http_headers
+from dataclasses import dataclass, field, fields
 from starlette.requests import Request
-from starlette.responses import PlainTextResponse
+from starlette.responses import JSONResponse, PlainTextResponse, Response
 
 from mcp_clickhouse.mcp_env import get_config, get_chdb_config
 from mcp_clickhouse.chdb_prompt import CHDB_PROMPT
+from mcp_clickhouse.chdb_session import SharedChDBSession
+from mcp_clickhouse.chdb_arrow import (
+    DISABLE_COMPRESSION_SETTING,
+    ArrowUnsupportedError,
+    ChDBResult,
+    fetch_result,
+    result_to_rows,
+)
+from mcp_clickhouse.chdb_sources import SourceCache
+from mcp_clickhouse.chdb_workers import ChDBProcessPool
+from mcp_clickhouse.admission import AdmissionController, ServerBusyError
+from mcp_clickhouse.executors import ExecutorPool
+from mcp_clickhouse.health import HealthCheck, HealthStatus
+from mcp_clickhouse.serialization import dumps, to_builtins
+from mcp_clickhouse.tracing import current_trace_id, query_span, record_span, span
+from mcp_clickhouse.cache import TTLCache, is_deterministic_query, normalize_query
+from mcp_clickhouse.client_pool import (
+    ClickHousePool,
+    PoolTimeoutError,
+    close_all_pools,
+    get_pool,
+    get_pool_stats,
+    is_connection_error,
+)
+from mcp_clickhouse.cursors import CursorRegistry, QueryCursor
+from mcp_clickhouse.metrics import (
+    REGISTRY,
+    TOOL_CALLS,
+    TOOL_DURATION,
+    TOOL_ERRORS,
+    TOOL_EXECUTION,
+    TOOL_QUEUE_WAIT,
+    TOOL_REJECTIONS,
+    TOOL_RESPONSE_BYTES,
+    TOOL_ROWS,
+    TOOL_TIMEOUTS,
+    CallbackGauge,
+    current_tool,
+)
+from mcp_clickhouse.exports import (
+    EXPORT_FORMATS,
+    new_export_path,
+    remove_expired_exports,
+    write_export,
+)
 
 
-@dataclass
+@dataclass(slots=True)
 class Column:
     database: str
     table: str
@@ -32,7 +84,17 @@ class Column:
     comment: Optional[str]
 
 
-@dataclass
+@dataclass(slots=True)
+class TableSummary:
+    database: str
+    name: str
+    engine: str
+    total_rows: int
+    total_bytes: int
+    comment: Optional[str] = None
+
+
+@dataclass(slots=True)
 class Table:
     database: str
     name: str
@@ -49,6 +111,14 @@ class Table:
     columns: List[Column] = field(default_factory=list)
 
 
+# system.tables columns selected for Table and TableSummary records, in field order
+TABLE_COLUMNS = (
+    "database, name, engine, create_table_query, dependencies_database, dependencies_table, "
+    "engine_full, sorting_key, primary_key, total_rows, total_bytes, comment"
+)
+TABLE_SUMMARY_COLUMNS = "database, name, engine, total_rows, total_bytes, comment"
+
+
 MCP_SERVER_NAME = "mcp-clickhouse"
 
 # Configure logging
@@ -62,11 +132,385 @@ load_dotenv()
 config = get_config()
 thread_pool_size = config.thread_pool_size if config.enabled else 10
 
-QUERY_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=thread_pool_size)
-atexit.register(lambda: QUERY_EXECUTOR.shutdown(wait=True))
+# Separate pools, so that slow SELECTs never hold up metadata lookups, chDB
+# queries or health checks
+EXECUTORS = {
+    "query": ExecutorPool("query", thread_pool_size),
+    "metadata": ExecutorPool("metadata", config.metadata_thread_pool_size),
+    "chdb": ExecutorPool("chdb", get_chdb_config().thread_pool_size),
+    "health": ExecutorPool("health", config.health_thread_pool_size),
+}
+for _executor in EXECUTORS.values():
+    atexit.register(_executor.shutdown, wait=True)
 SELECT_QUERY_TIMEOUT_SECS = 30
+# Rows per block used to estimate the serialized size of a result
+RESULT_SIZE_SAMPLE_ROWS = 100
+# Upper bound on the number of cached query results, which are mostly bounded by size
+RESULT_CACHE_MAX_ENTRIES = 1024
+# Result layouts accepted by run_select_query
+RESULT_FORMATS = ("rows", "columns", "records")
+
+logger.info(
+    "Initialized thread pools: "
+    + ", ".join(f"{name}={pool.max_workers}" for name, pool in EXECUTORS.items())
+)
+atexit.register(close_all_pools)
+
+QUERY_CURSORS = CursorRegistry(ttl=config.cursor_ttl_secs, max_open=config.cursor_max_open)
+atexit.register(QUERY_CURSORS.close_all)
+
+# Database and table metadata, keyed by ("databases",), ("describe", database, table)
+# or the list_tables arguments
+METADATA_CACHE = TTLCache(
+    max_entries=config.metadata_cache_max_entries, ttl=config.metadata_cache_ttl_secs
+)
+# Results of identical deterministic SELECTs, keyed by (normalized query, readonly, database)
+RESULT_CACHE = TTLCache(
+    max_entries=RESULT_CACHE_MAX_ENTRIES,
+    ttl=config.result_cache_ttl_secs,
+    max_bytes=config.result_cache_max_bytes,
+)
+CACHES = {"metadata": METADATA_CACHE, "result": RESULT_CACHE}
+
+
+def cache_stat(name: str):
+    """Get a callback reading one stat of every cache, for a labelled gauge."""
+    return lambda: {(cache_name,): cache.stats()[name] for cache_name, cache in CACHES.items()}
+
+
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_cache_entries",
+        "Entries held by the cache.",
+        cache_stat("entries"),
+        ["cache"],
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_cache_bytes",
+        "Estimated size of the cached results in bytes.",
+        cache_stat("bytes"),
+        ["cache"],
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_cache_hits",
+        "Lookups served from the cache, including revalidated entries.",
+        cache_stat("hits"),
+        ["cache"],
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_cache_misses",
+        "Lookups that found no usable entry.",
+        cache_stat("misses"),
+        ["cache"],
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_cache_revalidations",
+        "Stale entries reused because their fingerprint was unchanged.",
+        cache_stat("revalidations"),
+        ["cache"],
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_cache_evictions",
+        "Entries evicted to stay within the size limits.",
+        cache_stat("evictions"),
+        ["cache"],
+    )
+)
+
+
+# Bounds how much tool work is running and waiting, fairly across clients
+ADMISSION = AdmissionController(
+    max_active=config.max_concurrent_queries,
+    max_queued=config.max_queued_queries,
+    max_active_per_client=config.max_concurrent_queries_per_client,
+    max_queued_per_client=config.max_queued_queries_per_client,
+    weights=config.client_weights,
+)
+
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_admission_active",
+        "Tool calls admitted and not yet finished.",
+        lambda: ADMISSION.stats()["active"],
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_admission_queued",
+        "Tool calls waiting for admission.",
+        lambda: ADMISSION.stats()["queued"],
+    )
+)
+
+
+def executor_stat(name: str):
+    """Get a callback reading one stat of every executor pool, for a labelled gauge."""
+    return lambda: {(pool_name,): pool.stats()[name] for pool_name, pool in EXECUTORS.items()}
+
+
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_executor_queue_depth",
+        "Tool work waiting for a free executor thread.",
+        executor_stat("queued"),
+        ["pool"],
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_executor_active_workers",
+        "Executor threads currently running tool work.",
+        executor_stat("active"),
+        ["pool"],
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_executor_max_workers",
+        "Size of the executor thread pool.",
+        executor_stat("max_workers"),
+        ["pool"],
+    )
+)
+
+
+def pool_stat(name: str):
+    """Get a callback reading one stat of the client pools of each host, for a labelled gauge."""
+
+    def read():
+        values = {}
+        for stats in get_pool_stats():
+            key = (stats["host"],)
+            values[key] = values.get(key, 0) + stats[name]
+        return values
+
+    return read
+
+
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_pool_max_size",
+        "Maximum number of clients in the pool.",
+        pool_stat("max_size"),
+        ["host"],
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_pool_in_use",
+        "Pooled clients checked out by tool work.",
+        pool_stat("in_use"),
+        ["host"],
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_pool_idle", "Pooled clients ready for reuse.", pool_stat("idle"), ["host"]
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_pool_waiting",
+        "Tool work waiting for a free pooled client.",
+        pool_stat("waiting"),
+        ["host"],
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_pool_created",
+        "Clients created by the pool.",
+        pool_stat("created"),
+        ["host"],
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_pool_evicted",
+        "Clients evicted after a connection error or failed health check.",
+        pool_stat("evicted"),
+        ["host"],
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "mcp_clickhouse_pool_timeouts",
+        "Waits for a pooled client that timed out.",
+        pool_stat("timeouts"),
+        ["host"],
+    )
+)
+
+
+def track_executor_call(func, tool: str):
+    """Wrap a function submitted to an executor pool to record its queue wait and run time.
+
+    The function runs in a copy of the submitting context, so the current tool and
+    trace span carry over into the executor thread.
+    """
+    submitted_at = time.perf_counter()
+    submitted_ns = time.time_ns()
+    context = contextvars.copy_context()
+
+    def call(*args):
+        started_at = time.perf_counter()
+        TOOL_QUEUE_WAIT.observe(started_at - submitted_at, tool=tool)
+        try:
+            return context.run(run_traced, tool, submitted_ns, func, *args)
+        finally:
+            TOOL_EXECUTION.observe(time.perf_counter() - started_at, tool=tool)
+
+    return call
+
+
+def run_traced(tool: str, submitted_ns: int, func, *args):
+    record_span("executor.queue_wait", submitted_ns, **{"mcp.tool.name": tool})
+    with span("executor.run", **{"mcp.tool.name": tool, "code.function": func.__name__}):
+        return func(*args)
+
+
+def current_client_id() -> str:
+    """Identify the client behind the current tool call, for admission control.
+
+    Clients are told apart by API key, which is hashed so it never ends up in logs,
+    or else by MCP session. Calls over stdio all come from the one local client.
+    """
+    headers = get_http_headers(include_all=True)
+    api_key = headers.get("x-api-key") or headers.get("authorization")
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+    session_id = headers.get("mcp-session-id")
+    if session_id:
+        return f"session:{session_id}"
+    return "local"
+
+
+async def run_in_executor(func, *args, timeout: float, pool: str = "query"):
+    """Run a blocking function on an executor pool and await it without blocking the event loop.
+
+    Work for the query pool first needs an admission slot for its client. The slot
+    is held until the function returns, even if the caller stops waiting.
+
+    Raises asyncio.TimeoutError if the call does not finish within timeout seconds,
+    including the time spent waiting for admission. The pending future is cancelled
+    on timeout, which only takes effect if the call has not started running yet.
+    Raises ToolError if admission control rejects the call.
+    """
+    tool = current_tool.get()
+    client = current_client_id()
+    executor = EXECUTORS[pool]
+    admit = pool == "query"
+
+    async def admitted_call():
+        if admit:
+            await ADMISSION.acquire(client)
+        try:
+            future = executor.submit(track_executor_call(func, tool), *args)
+        except BaseException:
+            if admit:
+                ADMISSION.release(client)
+            raise
+        if admit:
+            future.add_done_callback(lambda _: ADMISSION.release(client))
+        return await asyncio.wrap_future(future)
+
+    try:
+        return await asyncio.wait_for(admitted_call(), timeout)
+    except asyncio.TimeoutError:
+        TOOL_TIMEOUTS.inc(tool=tool)
+        raise
+    except ServerBusyError as e:
+        TOOL_REJECTIONS.inc(tool=tool)
+        logger.warning(f"{tool} call from client {client} rejected: {e}")
+        raise ToolError(str(e))
+
+
+def record_tool_result(tool: str, result) -> None:
+    """Record the number of rows and the estimated response size of a tool result."""
+    if isinstance(result, dict) and result.get("status") == "error":
+        TOOL_ERRORS.inc(tool=tool)
+        return
+    rows = None
+    if isinstance(result, str):
+        size = len(result)
+    elif isinstance(result, list):
+        rows = len(result)
+        size = estimate_row_bytes(result) * rows
+    elif isinstance(result, dict) and isinstance(result.get("rows"), list):
+        rows = len(result["rows"])
+        rest = {key: value for key, value in result.items() if key != "rows"}
+        size = estimate_row_bytes(result["rows"]) * rows + len(dumps(rest))
+    elif isinstance(result, dict) and isinstance(result.get("data"), list):
+        data = result["data"]
+        rows = len(data[0]) if data else 0
+        rest = {key: value for key, value in result.items() if key != "data"}
+        size = sum(estimate_row_bytes(column) * rows for column in data)
+        size += len(dumps(rest))
+    else:
+        if isinstance(result, dict):
+            rows = result.get("row_count")
+        size = len(dumps(result))
+    if rows is not None:
+        TOOL_ROWS.observe(rows, tool=tool)
+    TOOL_RESPONSE_BYTES.observe(size, tool=tool)
+
+
+def instrument_tool(func):
+    """Record call, error and latency metrics for a tool function, sync or async."""
+    tool = func.__name__
+
+    def start():
+        TOOL_CALLS.inc(tool=tool)
+        return current_tool.set(tool), time.perf_counter()
+
+    def finish(token, started_at, result=None, failed=False):
+        TOOL_DURATION.observe(time.perf_counter() - started_at, tool=tool)
+        current_tool.reset(token)
+        if failed:
+            TOOL_ERRORS.inc(tool=tool)
+        else:
+            record_tool_result(tool, result)
+
+    if asyncio.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            token, started_at = start()
+            try:
+                with span(f"mcp.tool {tool}", **{"mcp.tool.name": tool}):
+                    result = await func(*args, **kwargs)
+            except BaseException:
+                finish(token, started_at, failed=True)
+                raise
+            finish(token, started_at, result)
+            return result
+
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token, started_at = start()
+        try:
+            with span(f"mcp.tool {tool}", **{"mcp.tool.name": tool}):
+                result = func(*args, **kwargs)
+        except BaseException:
+            finish(token, started_at, failed=True)
+            raise
+        finish(token, started_at, result)
+        return result
+
+    return wrapper
 
-logger.info(f"Initialized thread pool with {thread_pool_size} workers")
 
 mcp = FastMCP(
     name=MCP_SERVER_NAME,
@@ -76,23 +520,43 @@ mcp = FastMCP(
         "pip-system-certs",
         "chdb",
     ],
+    # Compiled JSON encoding of tool results, see mcp_clickhouse.serialization. Only
+    # applies to tools added with @mcp.tool, the others are given it on registration
+    tool_serializer=dumps,
 )
 
 
 def health_check_sync():
     """Synchronous health check for use in thread pool."""
-    # Try to create a client connection to verify ClickHouse connectivity
-    client = create_clickhouse_client()
-    try:
-        version = client.server_version
-        return f"OK - Connected to ClickHouse {version}"
-    finally:
-        # 确保连接被正确关闭
-        if client and hasattr(client, 'close'):
-            try:
-                client.close()
-            except Exception as e:
-                logger.warning(f"Error closing ClickHouse client in health check: {e}")
+    with spare_connection() as client:
+        client.command("SELECT 1")
+        return f"Connected to ClickHouse {client.server_version}"
+
+
+# Probes of the ClickHouse connection, shared by every health route
+HEALTH = HealthCheck(health_check_sync, ttl=config.health_cache_secs)
+HEALTH_CHECK_TIMEOUT_SECS = 10
+
+
+async def clickhouse_health() -> HealthStatus:
+    """Get the cached ClickHouse health, probing on the health pool if it is stale.
+
+    Raises asyncio.TimeoutError if the probe does not finish in time.
+    """
+    status = HEALTH.cached()
+    if status is None:
+        # Health checks run on their own pool, outside of admission control, so
+        # they still answer while every query thread is busy
+        status = await run_in_executor(
+            HEALTH.status, timeout=HEALTH_CHECK_TIMEOUT_SECS, pool="health"
+        )
+    return status
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> Response:
+    """Prometheus metrics for the tools and the query executor."""
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @mcp.custom_route("/health", methods=["GET"])
@@ -103,42 +567,107 @@ async def health_check(request: Request) -> PlainTextResponse:
     """
     try:
         # 使用线程池异步执行健康检查，避免阻塞主线程
-        future = QUERY_EXECUTOR.submit(health_check_sync)
-        try:
-            result = future.result(timeout=10)  # 10秒超时
-            return PlainTextResponse(result)
-        except concurrent.futures.TimeoutError:
-            future.cancel()
-            return PlainTextResponse("ERROR - Health check timed out", status_code=503)
-    except Exception as e:
+        status = await clickhouse_health()
+    except asyncio.TimeoutError:
+        return PlainTextResponse("ERROR - Health check timed out", status_code=503)
+    if not status.healthy:
         # Return 503 Service Unavailable if we can't connect to ClickHouse
-        return PlainTextResponse(f"ERROR - Cannot connect to ClickHouse: {str(e)}", status_code=503)
+        return PlainTextResponse(
+            f"ERROR - Cannot connect to ClickHouse: {status.message}", status_code=503
+        )
+    return PlainTextResponse(f"OK - {status.message}")
+
+
+@mcp.custom_route("/health/live", methods=["GET"])
+async def liveness_check(request: Request) -> PlainTextResponse:
+    """Liveness probe: the server process is running and its event loop responds.
+
+    ClickHouse is not contacted, so an unreachable server never gets this process restarted.
+    """
+    return PlainTextResponse("OK")
+
+
+@mcp.custom_route("/health/ready", methods=["GET"])
+async def readiness_check(request: Request) -> JSONResponse:
+    """Readiness probe: ClickHouse is reachable and new queries would be admitted.
+
+    Also reports how saturated the client pool, admission queue and thread pools are.
+    With ClickHouse disabled, only the admission queue decides readiness.
+    """
+    admission = ADMISSION.stats()
+    admission.pop("clients")
+    busy = admission["queued"] >= admission["max_queued"]
+    body = {}
+    ready = not busy
+    if config.enabled:
+        try:
+            status = await clickhouse_health()
+            clickhouse = {"healthy": status.healthy, "message": status.message}
+        except asyncio.TimeoutError:
+            clickhouse = {"healthy": False, "message": "Health check timed out"}
+        pool = get_clickhouse_pool().stats()
+        ready = ready and clickhouse["healthy"]
+        body["clickhouse"] = clickhouse
+        body["pool"] = {
+            "in_use": pool["in_use"],
+            "idle": pool["idle"],
+            "max_size": pool["max_size"],
+            "waiting": pool["waiting"],
+            "saturated": pool["in_use"] >= pool["max_size"],
+        }
+    else:
+        body["clickhouse"] = {"enabled": False}
+    body["admission"] = dict(admission, saturated=busy)
+    body["executors"] = {name: executor.stats() for name, executor in EXECUTORS.items()}
+    return JSONResponse(
+        {"status": "ready" if ready else "not ready", **body}, status_code=200 if ready else 503
+    )
 
 
 def result_to_table(query_columns, result) -> List[Table]:
-    return [Table(**dict(zip(query_columns, row))) for row in result]
+    check_field_order(Table, query_columns)
+    return [Table(*row) for row in result]
 
 
 def result_to_column(query_columns, result) -> List[Column]:
-    return [Column(**dict(zip(query_columns, row))) for row in result]
+    check_field_order(Column, query_columns)
+    return [Column(*row) for row in result]
+
 
+def check_field_order(cls, query_columns) -> None:
+    """Check that query columns line up with the leading dataclass fields.
+
+    Records are built positionally from result rows, without a dict per row, so
+    the query must select the columns in field order.
+    """
+    names = [f.name for f in fields(cls)][: len(query_columns)]
+    if list(query_columns) != names:
+        raise ValueError(
+            f"Query columns {list(query_columns)} do not match {cls.__name__} fields {names}"
+        )
 
-def to_json(obj: Any) -> str:
-    if is_dataclass(obj):
-        return json.dumps(asdict(obj), default=to_json)
-    elif isinstance(obj, list):
-        return [to_json(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: to_json(value) for key, value in obj.items()}
-    return obj
+
+def database_fingerprint():
+    """Get a cheap fingerprint of the set of databases."""
+    query = "SELECT count(), groupBitXor(cityHash64(name)) FROM system.databases"
+    with get_clickhouse_pool().connection() as client:
+        return tuple(client.query(query).result_rows[0])
 
 
 def list_databases_sync():
     """Synchronous implementation of list_databases for use in thread pool."""
     logger.info("Listing all databases")
-    client = create_clickhouse_client()
     try:
-        result = client.command("SHOW DATABASES")
+        # Computed once, whether by a stale entry's revalidation or for a new entry
+        fingerprint = cache(database_fingerprint)
+        cached = METADATA_CACHE.get(("databases",), fingerprint)
+        if cached is not None:
+            logger.info("Serving database list from the metadata cache")
+            return cached
+        fingerprint = fingerprint()
+        with get_clickhouse_pool().connection() as client:
+            with query_span("SHOW DATABASES"):
+                result = client.command("SHOW DATABASES")
 
         # Convert newline-separated string to list and trim whitespace
         if isinstance(result, str):
@@ -147,32 +676,28 @@ def list_databases_sync():
             databases = [result]
 
         logger.info(f"Found {len(databases)} databases")
-        return json.dumps(databases)
+        result = json.dumps(databases)
+        METADATA_CACHE.put(("databases",), result, fingerprint)
+        return result
     except Exception as e:
         logger.error(f"Error listing databases: {e}")
         raise ToolError(f"Failed to list databases: {str(e)}")
-    finally:
-        # 确保连接被正确关闭
-        if client and hasattr(client, 'close'):
-            try:
-                client.close()
-            except Exception as e:
-                logger.warning(f"Error closing ClickHouse client: {e}")
 
 
-def list_databases():
+@instrument_tool
+async def list_databases():
     """List available ClickHouse databases"""
     logger.info("Submitting list_databases request to thread pool")
     try:
         # 使用线程池异步执行，避免阻塞主线程
-        future = QUERY_EXECUTOR.submit(list_databases_sync)
         try:
-            result = future.result(timeout=SELECT_QUERY_TIMEOUT_SECS)
+            result = await run_in_executor(
+                list_databases_sync, timeout=SELECT_QUERY_TIMEOUT_SECS, pool="metadata"
+            )
             logger.info("list_databases completed successfully")
             return result
-        except concurrent.futures.TimeoutError:
+        except asyncio.TimeoutError:
             logger.warning(f"list_databases timed out after {SELECT_QUERY_TIMEOUT_SECS} seconds")
-            future.cancel()
             raise ToolError(f"List databases operation timed out after {SELECT_QUERY_TIMEOUT_SECS} seconds")
     except ToolError:
         raise
@@ -181,20 +706,156 @@ def list_databases():
         raise RuntimeError(f"Unexpected error during list databases operation: {str(e)}")
 
 
-def list_tables_sync(database: str, like: Optional[str] = None, not_like: Optional[str] = None):
-    """Synchronous implementation of list_tables for use in thread pool."""
+def table_filter(
+    database: str,
+    like: Optional[str] = None,
+    not_like: Optional[str] = None,
+    name: Optional[str] = None,
+    engine: Optional[str] = None,
+    min_rows: Optional[int] = None,
+    name_regex: Optional[str] = None,
+) -> str:
+    """Build the system.tables WHERE clause shared by list_tables and describe_table queries."""
+    condition = f"database = {format_query_value(database)}"
+    if like:
+        condition += f" AND name LIKE {format_query_value(like)}"
+    if not_like:
+        condition += f" AND name NOT LIKE {format_query_value(not_like)}"
+    if name:
+        condition += f" AND name = {format_query_value(name)}"
+    if engine:
+        condition += f" AND engine = {format_query_value(engine)}"
+    if min_rows is not None:
+        condition += f" AND total_rows >= {int(min_rows)}"
+    if name_regex:
+        condition += f" AND match(name, {format_query_value(name_regex)})"
+    return condition
+
+
+def table_page(condition: str, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """Get the WHERE condition and ORDER BY/LIMIT clause for one page of tables.
+
+    Pages are ordered by name, and cursor is the last name of the previous page, so
+    each page is read directly instead of skipping over the earlier ones.
+    """
+    if cursor:
+        condition += f" AND name > {format_query_value(cursor)}"
+    order = " ORDER BY name"
+    if limit:
+        order += f" LIMIT {int(limit)}"
+    return condition, order
+
+
+def table_fingerprint(condition: str):
+    """Get a cheap fingerprint of the tables matched by a table_filter() condition.
+
+    Creating, dropping, renaming or altering a table changes the count, the set of
+    names or the latest metadata_modification_time. Inserts, merges and mutations
+    change the total rows or bytes.
+    """
+    query = (
+        "SELECT count(), max(metadata_modification_time), groupBitXor(cityHash64(name)), "
+        f"sum(total_rows), sum(total_bytes) FROM system.tables WHERE {condition}"
+    )
+    with get_clickhouse_pool().connection() as client:
+        return tuple(client.query(query).result_rows[0])
+
+
+def fetch_columns(client, database: str, tables_query: str) -> dict:
+    """Get the columns of the tables selected by tables_query in one query, grouped by table name.
+
+    The table names are selected by a subquery on the server instead of being sent
+    back in an IN list, which stays small however many tables are listed.
+    """
+    batch_column_query = f"""
+    SELECT database, table, name, type AS column_type, default_kind, default_expression, comment 
+    FROM system.columns 
+    WHERE database = {format_query_value(database)} 
+    AND table IN ({tables_query})
+    ORDER BY database, table, position
+    """
+
+    logger.info("Executing batch column query")
+    with query_span(batch_column_query):
+        column_result = client.query(batch_column_query)
+    all_columns = result_to_column(column_result.column_names, column_result.result_rows)
+
+    # 将列信息按表名分组
+    columns_by_table = {}
+    for column in all_columns:
+        columns_by_table.setdefault(column.table, []).append(column)
+    return columns_by_table
+
+
+def list_tables_sync(
+    database: str,
+    like: Optional[str] = None,
+    not_like: Optional[str] = None,
+    summary_only: bool = False,
+    engine: Optional[str] = None,
+    min_rows: Optional[int] = None,
+    name_regex: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+):
+    """Synchronous implementation of list_tables for use in thread pool.
+
+    Results are cached in METADATA_CACHE. Once an entry is older than the cache TTL
+    it is reused only if the table fingerprint has not changed.
+
+    With a limit, returns one page of tables and the cursor of the next page.
+    """
     logger.info(f"Listing tables in database '{database}'")
-    client = create_clickhouse_client()
+    key = (database, like, not_like, summary_only, engine, min_rows, name_regex, limit, cursor)
+    condition = table_filter(
+        database, like, not_like, engine=engine, min_rows=min_rows, name_regex=name_regex
+    )
     try:
-        query = f"SELECT database, name, engine, create_table_query, dependencies_database, dependencies_table, engine_full, sorting_key, primary_key, total_rows, total_bytes, comment FROM system.tables WHERE database = {format_query_value(database)}"
-        if like:
-            query += f" AND name LIKE {format_query_value(like)}"
+        # Computed once, whether by a stale entry's revalidation or for a new entry
+        fingerprint = cache(partial(table_fingerprint, condition))
+        cached = METADATA_CACHE.get(key, fingerprint)
+        if cached is not None:
+            logger.info("Serving tables from the metadata cache")
+            return cached
+        fingerprint = fingerprint()
+        result = read_tables(database, condition, summary_only, limit, cursor)
+        if limit:
+            next_cursor = result[-1]["name"] if len(result) == limit else None
+            result = {"tables": result, "next_cursor": next_cursor}
+        METADATA_CACHE.put(key, result, fingerprint)
+        return result
+    except Exception as e:
+        logger.error(f"Error listing tables in database '{database}': {e}")
+        raise ToolError(f"Failed to list tables: {str(e)}")
 
-        if not_like:
-            query += f" AND name NOT LIKE {format_query_value(not_like)}"
+
+def read_tables(
+    database: str,
+    condition: str,
+    summary_only: bool = False,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> list:
+    """Read the tables matching a table_filter() condition, with their columns unless
+    summary_only is set, as JSON-compatible dicts."""
+    page_condition, order = table_page(condition, limit, cursor)
+    with get_clickhouse_pool().connection() as client:
+        if summary_only:
+            query = (
+                f"SELECT {TABLE_SUMMARY_COLUMNS} FROM system.tables WHERE {page_condition}{order}"
+            )
+            with query_span(query):
+                result = client.query(query)
+            check_field_order(TableSummary, result.column_names)
+            tables = [TableSummary(*row) for row in result.result_rows]
+            logger.info(f"Found {len(tables)} tables")
+            return to_builtins(tables)
+
+        query = f"SELECT {TABLE_COLUMNS} FROM system.tables WHERE {page_condition}{order}"
 
         # 第一次查询：获取所有表的基本信息
-        result = client.query(query)
+        with query_span(query):
+            result = client.query(query)
 
         # Deserialize result as Table dataclass instances
         tables = result_to_table(result.column_names, result.result_rows)
@@ -206,63 +867,70 @@ def list_tables_sync(database: str, like: Optional[str] = None, not_like: Option
         logger.info(f"Found {len(tables)} tables, fetching column information...")
 
         # 第二次查询：批量获取所有表的列信息（关键优化！）
-        table_names = [table.name for table in tables]
-        table_names_str = ','.join(format_query_value(name) for name in table_names)
-        
-        batch_column_query = f"""
-        SELECT database, table, name, type AS column_type, default_kind, default_expression, comment 
-        FROM system.columns 
-        WHERE database = {format_query_value(database)} 
-        AND table IN ({table_names_str})
-        ORDER BY database, table, position
-        """
-        
-        logger.info(f"Executing batch column query for {len(tables)} tables")
-        column_result = client.query(batch_column_query)
-        all_columns = result_to_column(column_result.column_names, column_result.result_rows)
-        
-        # 将列信息按表名分组
-        columns_by_table = {}
-        for column in all_columns:
-            table_name = column.table
-            if table_name not in columns_by_table:
-                columns_by_table[table_name] = []
-            columns_by_table[table_name].append(column)
-        
+        tables_query = f"SELECT name FROM system.tables WHERE {page_condition}{order}"
+        columns_by_table = fetch_columns(client, database, tables_query)
+
         # 为每个表分配其对应的列信息
         for table in tables:
             table.columns = columns_by_table.get(table.name, [])
 
-        logger.info(f"Successfully processed {len(tables)} tables with {len(all_columns)} total columns")
-        return [asdict(table) for table in tables]
-    except Exception as e:
-        logger.error(f"Error listing tables in database '{database}': {e}")
-        raise ToolError(f"Failed to list tables: {str(e)}")
-    finally:
-        # 确保连接被正确关闭
-        if client and hasattr(client, 'close'):
-            try:
-                client.close()
-            except Exception as e:
-                logger.warning(f"Error closing ClickHouse client: {e}")
+    column_count = sum(len(table.columns) for table in tables)
+    logger.info(f"Successfully processed {len(tables)} tables with {column_count} total columns")
+    with span("serialize_result", **{"mcp.result.rows": len(tables)}):
+        return to_builtins(tables)
+
+
+@instrument_tool
+async def list_tables(
+    database: str,
+    like: Optional[str] = None,
+    not_like: Optional[str] = None,
+    summary_only: bool = False,
+    engine: Optional[str] = None,
+    min_rows: Optional[int] = None,
+    name_regex: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+):
+    """List available ClickHouse tables in a database, including schema, comment,
+    row count, and column count.
 
+    Set summary_only to true to return only each table's name, engine, row and byte
+    counts and comment, which is much smaller for large databases. Use describe_table
+    to get the columns and DDL of a single table.
 
-def list_tables(database: str, like: Optional[str] = None, not_like: Optional[str] = None):
-    """List available ClickHouse tables in a database, including schema, comment,
-    row count, and column count."""
+    Tables can be filtered by exact engine name (e.g. "MergeTree"), by a minimum
+    row count and by a regular expression on the table name.
+
+    Pass limit to page through a large database: the tables are ordered by name and
+    the result is {"tables": [...], "next_cursor": ...}. Pass next_cursor as cursor
+    to get the next page; it is null on the last page.
+    """
+    if limit is not None and limit <= 0:
+        raise ToolError("limit must be a positive number")
     logger.info(f"Submitting list_tables request for database '{database}' to thread pool")
     try:
-        # 使用线程池异步执行，避免阻塞主线程
-        future = QUERY_EXECUTOR.submit(list_tables_sync, database, like, not_like)
+        # 设置更长的超时时间，因为 list_tables 操作比普通查询更复杂
+        LIST_TABLES_TIMEOUT_SECS = 120  # 2分钟超时
         try:
-            # 设置更长的超时时间，因为 list_tables 操作比普通查询更复杂
-            LIST_TABLES_TIMEOUT_SECS = 120  # 2分钟超时
-            result = future.result(timeout=LIST_TABLES_TIMEOUT_SECS)
+            result = await run_in_executor(
+                list_tables_sync,
+                database,
+                like,
+                not_like,
+                summary_only,
+                engine,
+                min_rows,
+                name_regex,
+                limit,
+                cursor,
+                timeout=LIST_TABLES_TIMEOUT_SECS,
+                pool="metadata",
+            )
             logger.info(f"list_tables completed successfully for database '{database}'")
             return result
-        except concurrent.futures.TimeoutError:
+        except asyncio.TimeoutError:
             logger.warning(f"list_tables timed out after {LIST_TABLES_TIMEOUT_SECS} seconds for database '{database}'")
-            future.cancel()
             raise ToolError(f"List tables operation timed out after {LIST_TABLES_TIMEOUT_SECS} seconds")
     except ToolError:
         raise
@@ -271,32 +939,310 @@ def list_tables(database: str, like: Optional[str] = None, not_like: Optional[st
         raise RuntimeError(f"Unexpected error during list tables operation: {str(e)}")
 
 
-def execute_query(query: str):
-    client = create_clickhouse_client()
+def describe_table_sync(database: str, table: str):
+    """Synchronous implementation of describe_table for use in thread pool.
+
+    Cached in METADATA_CACHE like list_tables results.
+    """
+    logger.info(f"Describing table '{database}.{table}'")
+    key = ("describe", database, table)
+    condition = table_filter(database, name=table)
     try:
-        read_only = get_readonly_setting(client)
-        res = client.query(query, settings={"readonly": read_only})
-        logger.info(f"Query returned {len(res.result_rows)} rows")
-        return {"columns": res.column_names, "rows": res.result_rows}
+        fingerprint = cache(partial(table_fingerprint, condition))
+        cached = METADATA_CACHE.get(key, fingerprint)
+        if cached is not None:
+            logger.info(f"Serving table '{database}.{table}' from the metadata cache")
+            return cached
+        fingerprint = fingerprint()
+        tables = read_tables(database, condition)
+        if not tables:
+            raise ToolError(f"Table '{database}.{table}' does not exist")
+        METADATA_CACHE.put(key, tables[0], fingerprint)
+        return tables[0]
+    except ToolError:
+        raise
+    except Exception as e:
+        logger.error(f"Error describing table '{database}.{table}': {e}")
+        raise ToolError(f"Failed to describe table: {str(e)}")
+
+
+@instrument_tool
+async def describe_table(database: str, table: str):
+    """Describe a ClickHouse table: its engine, DDL, sorting and primary keys, row and
+    byte counts, comment, and every column with its type, default and comment."""
+    logger.info(f"Submitting describe_table request for '{database}.{table}' to thread pool")
+    try:
+        return await run_in_executor(
+            describe_table_sync, database, table, timeout=SELECT_QUERY_TIMEOUT_SECS, pool="metadata"
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"describe_table timed out after {SELECT_QUERY_TIMEOUT_SECS} seconds")
+        raise ToolError(f"Describe table operation timed out after {SELECT_QUERY_TIMEOUT_SECS} seconds")
+
+
+def execute_query(query: str, query_id: Optional[str] = None, result_format: Optional[str] = None):
+    query_id = query_id or str(uuid.uuid4())
+    use_cache = config.result_cache_enabled and is_deterministic_query(query)
+    cached = None
+    try:
+        with get_clickhouse_pool().connection() as client:
+            settings = build_query_settings(client, query_id)
+            if use_cache:
+                cache_key = (normalize_query(query), settings["readonly"], client.database)
+                cached = RESULT_CACHE.get(cache_key)
+            if cached is None:
+                with query_span(query, query_id), client.query_row_block_stream(
+                    query, settings=settings
+                ) as stream:
+                    column_names = stream.source.column_names
+                    rows, truncated = read_limited_rows(
+                        stream, config.max_result_rows, config.max_result_bytes
+                    )
     except Exception as err:
         logger.error(f"Error executing query: {err}")
         raise ToolError(f"Query execution failed: {str(err)}")
-    finally:
-        # 确保连接被正确关闭
-        if client and hasattr(client, 'close'):
-            try:
-                client.close()
-            except Exception as e:
-                logger.warning(f"Error closing ClickHouse client: {e}")
+
+    if cached is not None:
+        column_names, rows, truncation = cached
+        logger.info(f"Query served {len(rows)} rows from the result cache")
+    else:
+        logger.info(f"Query returned {len(rows)} rows")
+        truncation = {}
+        if truncated:
+            # The rest of the result is no longer read, so stop the query on the server
+            EXECUTORS["metadata"].submit(kill_query, query_id)
+            logger.warning(f"Query {query_id} result truncated to {len(rows)} rows")
+            truncation = {
+                "truncated": True,
+                "message": (
+                    f"Result truncated to {len(rows)} rows to stay within the result size limits. "
+                    "Add a LIMIT or aggregate the data, or use page_size to page through all rows."
+                ),
+            }
+        if use_cache:
+            RESULT_CACHE.put(
+                cache_key,
+                (column_names, rows, truncation),
+                size=int(estimate_row_bytes(rows) * len(rows)),
+            )
+
+    result_format = resolve_result_format(result_format, len(rows))
+    attributes = {"mcp.result.rows": len(rows), "mcp.result.format": result_format}
+    with span("serialize_result", **attributes):
+        result = format_result(column_names, rows, result_format)
+    result.update(truncation)
+    result["cached"] = cached is not None
+    return result
+
+
+def resolve_result_format(result_format: Optional[str], row_count: int) -> str:
+    """Pick the result layout, defaulting to columns for large results."""
+    if result_format:
+        return result_format
+    threshold = config.columnar_threshold_rows
+    return "columns" if threshold and row_count >= threshold else "rows"
+
+
+def format_result(column_names, rows, result_format: str) -> dict:
+    """Lay out result rows for the response.
+
+    - rows: "rows" is a list of row tuples
+    - columns: "data" holds one array of values per column, in the order of "columns".
+      Column names are not repeated per row, which keeps wide results much smaller.
+    - records: "rows" is a list of objects keyed by column name
+    """
+    if result_format == "columns":
+        data = [list(values) for values in zip(*rows)] if rows else [[] for _ in column_names]
+        return {"columns": column_names, "format": result_format, "data": data}
+    if result_format == "records":
+        rows = [dict(zip(column_names, row)) for row in rows]
+    return {"columns": column_names, "format": result_format, "rows": rows}
+
+
+def estimate_row_bytes(rows) -> float:
+    """Estimate the average JSON size of the rows from a sample taken evenly across them."""
+    if not rows:
+        return 0
+    sample = rows[:: max(1, len(rows) // RESULT_SIZE_SAMPLE_ROWS)]
+    return len(dumps(sample)) / len(sample)
+
+
+def read_limited_rows(stream, max_rows: int, max_bytes: int):
+    """Read rows from a row block stream until it ends or a size budget is used up.
+
+    The serialized size of each block is estimated with estimate_row_bytes().
+    A budget of 0 means no limit.
+
+    Returns:
+        The rows read and whether the result was truncated
+    """
+    rows = []
+    used_bytes = 0
+    for block in stream:
+        allowed = len(block)
+        if max_rows:
+            allowed = min(allowed, max_rows - len(rows))
+        row_bytes = 0
+        if max_bytes:
+            row_bytes = estimate_row_bytes(block)
+            allowed = min(allowed, int((max_bytes - used_bytes) // max(row_bytes, 1)))
+        rows.extend(block[:allowed])
+        used_bytes += allowed * row_bytes
+        if allowed < len(block):
+            return rows, True
+    return rows, False
+
+
+def export_query(query: str, query_id: str, export_format: str):
+    """Stream a query result as Arrow batches into an Arrow IPC or Parquet file.
+
+    The rows never pass through Python objects, and the row and byte budgets for
+    JSON results do not apply; the export is bounded by CLICKHOUSE_EXPORT_MAX_BYTES.
+    """
+    remove_expired_exports(config.export_dir, config.export_ttl_secs)
+    path = new_export_path(config.export_dir, export_format)
+    try:
+        with get_clickhouse_pool().connection() as client:
+            settings = build_query_settings(client, query_id, limit_result=False)
+            with query_span(query, query_id), client.query_arrow_stream(
+                query, settings=settings, use_strings=True
+            ) as stream:
+                result = write_export(stream, path, export_format, config.export_max_bytes)
+    except Exception as err:
+        logger.error(f"Error exporting query: {err}")
+        raise ToolError(f"Query export failed: {str(err)}")
+    logger.info(f"Exported {result['row_count']} rows of query {query_id} to {path}")
+    if result["truncated"]:
+        EXECUTORS["metadata"].submit(kill_query, query_id)
+        result["message"] = (
+            f"Export stopped after {result['row_count']} rows to stay within "
+            "CLICKHOUSE_EXPORT_MAX_BYTES."
+        )
+    return result
+
+
+def open_query_cursor(
+    query: str, query_id: str, page_size: int, result_format: Optional[str] = None
+):
+    """Start streaming a query and return its first page.
+
+    If more rows remain, the stream stays open in QUERY_CURSORS and the result
+    carries a next_cursor token for fetch_next_page.
+    """
+    pool = get_clickhouse_pool()
+    client = pool.acquire()
+    try:
+        # The query keeps running while the caller pages through it, so its
+        # execution limit follows the cursor lifetime rather than the tool timeout.
+        # Only one page is held at a time, so the result size limits do not apply.
+        settings = build_query_settings(
+            client, query_id, max_execution_time=config.cursor_ttl_secs, limit_result=False
+        )
+        with query_span(query, query_id):
+            stream = client.query_row_block_stream(query, settings=settings)
+            stream.__enter__()
+    except Exception as err:
+        pool.release(client, broken=is_connection_error(err))
+        logger.error(f"Error executing query: {err}")
+        raise ToolError(f"Query execution failed: {str(err)}")
+    # Every page of a cursor uses the same layout, chosen from the page size
+    cursor = QueryCursor(
+        client,
+        stream,
+        query_id,
+        page_size,
+        on_close=release_cursor,
+        result_format=resolve_result_format(result_format, page_size),
+    )
+    return read_cursor_page(cursor)
+
+
+def read_cursor_page(cursor: QueryCursor, token: Optional[str] = None, page_size: Optional[int] = None):
+    """Read the next page from a cursor, registering or closing it as needed."""
+    with cursor.lock:
+        try:
+            rows = cursor.fetch(page_size)
+        except Exception as err:
+            logger.error(f"Error reading query result: {err}")
+            if token:
+                QUERY_CURSORS.remove(token)
+            cursor.close()
+            raise ToolError(f"Query execution failed: {str(err)}")
+        if cursor.finished:
+            if token:
+                QUERY_CURSORS.remove(token)
+            cursor.close()
+            token = None
+        elif token is None:
+            token = QUERY_CURSORS.register(cursor)
+    logger.info(f"Query {cursor.query_id} returned a page of {len(rows)} rows")
+    result = format_result(cursor.column_names, rows, cursor.result_format)
+    result["next_cursor"] = token
+    return result
+
+
+def release_cursor(cursor: QueryCursor, finished: bool):
+    """Return a closed cursor's client to the pool.
+
+    A cursor closed before its result was fully read still has a query running on
+    the server, so the query is killed and the client is not reused.
+    """
+    if not finished:
+        kill_query(cursor.query_id)
+    get_clickhouse_pool().release(cursor.client, broken=not finished)
 
 
-def run_select_query(query: str):
-    """Run a SELECT query in a ClickHouse database"""
-    logger.info(f"Executing SELECT query: {query}")
+@instrument_tool
+async def run_select_query(
+    query: str,
+    page_size: Optional[int] = None,
+    format: Optional[str] = None,
+    export: Optional[str] = None,
+):
+    """Run a SELECT query in a ClickHouse database.
+
+    Pass page_size to stream a large result: only the first page_size rows are
+    returned, together with a next_cursor token to pass to fetch_next_page.
+
+    format selects the result layout: "rows" (a list of row arrays), "columns"
+    (one array of values per column, in "data") or "records" (a list of objects
+    keyed by column name). Large results default to "columns".
+
+    Set export to "arrow" or "parquet" to write the full result to a file instead
+    of returning rows. The response carries the file path, schema and row count.
+    """
+    if format is not None and format not in RESULT_FORMATS:
+        raise ToolError(
+            f"Invalid format '{format}'. Valid options: {', '.join(RESULT_FORMATS)}"
+        )
+    if export is not None:
+        if export not in EXPORT_FORMATS:
+            raise ToolError(
+                f"Invalid export '{export}'. Valid options: {', '.join(EXPORT_FORMATS)}"
+            )
+        if page_size:
+            raise ToolError("export cannot be combined with page_size")
+    query_id = str(uuid.uuid4())
+    logger.info(f"Executing SELECT query {query_id}: {query}")
     try:
-        future = QUERY_EXECUTOR.submit(execute_query, query)
         try:
-            result = future.result(timeout=SELECT_QUERY_TIMEOUT_SECS)
+            if export:
+                result = await run_in_executor(
+                    export_query, query, query_id, export, timeout=SELECT_QUERY_TIMEOUT_SECS
+                )
+            elif page_size:
+                result = await run_in_executor(
+                    open_query_cursor,
+                    query,
+                    query_id,
+                    page_size,
+                    format,
+                    timeout=SELECT_QUERY_TIMEOUT_SECS,
+                )
+            else:
+                result = await run_in_executor(
+                    execute_query, query, query_id, format, timeout=SELECT_QUERY_TIMEOUT_SECS
+                )
             # Check if we received an error structure from execute_query
             if isinstance(result, dict) and "error" in result:
                 logger.warning(f"Query failed: {result['error']}")
@@ -307,9 +1253,10 @@ def run_select_query(query: str):
                     "message": f"Query failed: {result['error']}",
                 }
             return result
-        except concurrent.futures.TimeoutError:
+        except asyncio.TimeoutError:
             logger.warning(f"Query timed out after {SELECT_QUERY_TIMEOUT_SECS} seconds: {query}")
-            future.cancel()
+            # Stop the query on the server; the executor thread is released once it returns
+            EXECUTORS["metadata"].submit(kill_query, query_id)
             raise ToolError(f"Query timed out after {SELECT_QUERY_TIMEOUT_SECS} seconds")
     except ToolError:
         raise
@@ -318,6 +1265,82 @@ def run_select_query(query: str):
         raise RuntimeError(f"Unexpected error during query execution: {str(e)}")
 
 
+@instrument_tool
+async def fetch_next_page(cursor: str, page_size: Optional[int] = None):
+    """Fetch the next page of a result started by run_select_query with page_size.
+
+    Returns the rows and the next_cursor token, which is null once all rows were read.
+    """
+    query_cursor = QUERY_CURSORS.get(cursor)
+    if query_cursor is None:
+        raise ToolError("Cursor not found or expired; run the query again")
+    try:
+        return await run_in_executor(
+            read_cursor_page, query_cursor, cursor, page_size, timeout=SELECT_QUERY_TIMEOUT_SECS
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"Fetching the next page timed out after {SELECT_QUERY_TIMEOUT_SECS} seconds")
+        # Killing the query unblocks the reading thread; the cursor is closed once it returns
+        EXECUTORS["metadata"].submit(kill_query, query_cursor.query_id)
+        EXECUTORS["metadata"].submit(QUERY_CURSORS.remove, cursor)
+        raise ToolError(f"Fetching the next page timed out after {SELECT_QUERY_TIMEOUT_SECS} seconds")
+
+
+def kill_query(query_id: str):
+    """Kill a running query on the server so it stops consuming resources.
+
+    Uses a separate connection from the one running the query: an idle pooled client
+    if one is free right away, otherwise a fresh client.
+    """
+    kill = f"KILL QUERY WHERE query_id = {format_query_value(query_id)} ASYNC"
+    try:
+        with spare_connection() as client:
+            client.command(kill)
+        logger.info(f"Killed query {query_id}")
+    except Exception as e:
+        logger.warning(f"Failed to kill query {query_id}: {e}")
+
+
+@contextmanager
+def spare_connection():
+    """Get a client for a short control statement without waiting behind running queries.
+
+    Yields an idle pooled client if one is free right away, otherwise a fresh client
+    that is closed afterwards.
+    """
+    pool = get_clickhouse_pool()
+    try:
+        client = pool.acquire(timeout=0)
+    except PoolTimeoutError:
+        client = None
+    if client is None:
+        client = create_clickhouse_client()
+        try:
+            yield client
+        finally:
+            client.close()
+        return
+    broken = False
+    try:
+        yield client
+    except BaseException as err:
+        broken = is_connection_error(err)
+        raise
+    finally:
+        pool.release(client, broken=broken)
+
+
+def get_clickhouse_pool() -> ClickHousePool:
+    """Get the shared pool of long-lived clients for the configured ClickHouse server."""
+    config = get_config()
+    return get_pool(
+        config.get_client_config(),
+        max_size=config.pool_size,
+        acquire_timeout=config.pool_acquire_timeout,
+        idle_check_secs=config.pool_idle_check_secs,
+    )
+
+
 def create_clickhouse_client():
     client_config = get_config().get_client_config()
     logger.info(
@@ -329,7 +1352,8 @@ def create_clickhouse_client():
     )
 
     try:
-        client = clickhouse_connect.get_client(**client_config)
+        with span("clickhouse.connect", **{"server.address": client_config["host"]}):
+            client = clickhouse_connect.get_client(**client_config)
         # Test the connection
         version = client.server_version
         logger.info(f"Successfully connected to ClickHouse server version {version}")
@@ -339,8 +1363,68 @@ def create_clickhouse_client():
         raise
 
 
-def get_readonly_setting(client) -> str:
-    """Get the appropriate readonly setting value to use for queries.
+@dataclass(frozen=True)
+class ServerCapabilities:
+    """Facts about the server and user that shape the settings sent with each query."""
+
+    # Readonly level to run queries with
+    readonly: str
+    # Settings in CAPABILITY_SETTINGS that this user is allowed to change per query
+    changeable_settings: frozenset
+
+
+# Server settings that build_query_settings() needs to know about
+CAPABILITY_SETTINGS = (
+    "readonly",
+    "max_execution_time",
+    "max_result_rows",
+    "result_overflow_mode",
+    "log_comment",
+)
+
+# Resolved capabilities per server URL, refreshed every CLICKHOUSE_CAPABILITIES_REFRESH_SECS
+SERVER_CAPABILITIES = TTLCache(max_entries=16, ttl=config.capabilities_refresh_secs)
+
+
+def get_server_capabilities(client) -> ServerCapabilities:
+    """Get the capabilities of the server a client is connected to.
+
+    They are resolved from system.settings once and shared by every client of the
+    process until the refresh interval has passed, so preparing a query does not
+    depend on when its pooled client happened to be created. If system.settings
+    cannot be read, the settings the client loaded when it connected are used.
+    """
+    capabilities = SERVER_CAPABILITIES.get(client.url)
+    if capabilities is not None:
+        return capabilities
+
+    names = ", ".join(format_query_value(name) for name in CAPABILITY_SETTINGS)
+    query = f"SELECT name, value, readonly FROM system.settings WHERE name IN ({names})"
+    try:
+        with query_span(query):
+            rows = client.query(query).result_rows
+        settings = {name: (value, bool(readonly)) for name, value, readonly in rows}
+    except Exception as e:
+        logger.warning(f"Could not read server settings, using the client's copy: {e}")
+        settings = {
+            name: (setting.value, setting.readonly)
+            for name, setting in client.server_settings.items()
+            if name in CAPABILITY_SETTINGS
+        }
+
+    capabilities = ServerCapabilities(
+        readonly=readonly_level(settings.get("readonly", (None, True))[0]),
+        changeable_settings=frozenset(
+            name for name, (_, readonly) in settings.items() if not readonly
+        ),
+    )
+    logger.info(f"Resolved ClickHouse server capabilities: {capabilities}")
+    SERVER_CAPABILITIES.put(client.url, capabilities)
+    return capabilities
+
+
+def readonly_level(server_value: Optional[str]) -> str:
+    """Get the readonly setting value to use for queries, given the server's value.
 
     This function handles potential conflicts between server and client readonly settings:
     - readonly=0: No read-only restrictions
@@ -350,8 +1434,16 @@ def get_readonly_setting(client) -> str:
     If server has readonly=2 and client tries to set readonly=1, it would cause:
     "Setting readonly is unknown or readonly" error
 
-    This function preserves the server's readonly setting unless it's 0, in which case
-    we enforce readonly=1 to ensure queries are read-only.
+    The server's readonly setting is preserved unless it's 0 or missing, in which
+    case readonly=1 is enforced to ensure queries are read-only.
+    """
+    if server_value is None or str(server_value) == "0":
+        return "1"  # Force read-only mode if server has it disabled or doesn't report it
+    return str(server_value)  # Respect server's readonly setting (likely 2)
+
+
+def get_readonly_setting(client) -> str:
+    """Get the appropriate readonly setting value to use for queries.
 
     Args:
         client: ClickHouse client connection
@@ -359,14 +1451,44 @@ def get_readonly_setting(client) -> str:
     Returns:
         String value of readonly setting to use
     """
-    read_only = client.server_settings.get("readonly")
-    if read_only:
-        if read_only == "0":
-            return "1"  # Force read-only mode if server has it disabled
-        else:
-            return read_only.value  # Respect server's readonly setting (likely 2)
-    else:
-        return "1"  # Default to basic read-only mode if setting isn't present
+    return get_server_capabilities(client).readonly
+
+
+def build_query_settings(
+    client,
+    query_id: Optional[str] = None,
+    max_execution_time: float = SELECT_QUERY_TIMEOUT_SECS,
+    limit_result: bool = True,
+) -> dict:
+    """Build the settings sent with every SELECT query.
+
+    Besides the readonly level, the query is tagged with query_id so it can be
+    killed, and given a server-side execution limit (the tool timeout by default)
+    and, unless limit_result is False, the configured row limit. Inside a trace,
+    log_comment is set to the trace id. Settings the server does not allow this
+    user to change are left out.
+
+    The server is allowed one row more than the limit, so that a result it cuts
+    off is seen to be truncated when it is read. The byte limit is only enforced
+    while reading, since the server counts bytes in memory rather than as JSON.
+    """
+    capabilities = get_server_capabilities(client)
+    settings = {"readonly": capabilities.readonly}
+    if query_id:
+        settings["query_id"] = query_id
+    limits = {"max_execution_time": int(max_execution_time)}
+    if limit_result and config.max_result_rows:
+        limits["max_result_rows"] = config.max_result_rows + 1
+    if len(limits) > 1:
+        limits["result_overflow_mode"] = config.result_overflow_mode
+    for name, value in limits.items():
+        if name in capabilities.changeable_settings:
+            settings[name] = value
+    # Lets the query be found in system.query_log by the id of the trace it ran in
+    trace_id = current_trace_id()
+    if trace_id and "log_comment" in capabilities.changeable_settings:
+        settings["log_comment"] = trace_id
+    return settings
 
 
 def create_chdb_client():
@@ -376,36 +1498,65 @@ def create_chdb_client():
     return _chdb_client
 
 
-def execute_chdb_query(query: str):
-    """Execute a query using chDB client."""
-    client = create_chdb_client()
-    try:
-        res = client.query(query, "JSON")
-        if res.has_error():
-            error_msg = res.error_message()
-            logger.error(f"Error executing chDB query: {error_msg}")
-            return {"error": error_msg}
-
-        result_data = res.data()
-        if not result_data:
-            return []
+# Error chDB stops a query with when it runs past max_execution_time
+CHDB_TIMEOUT_ERROR = "(TIMEOUT_EXCEEDED)"
+# Tables of file() and url() sources in the in-process session, if enabled. Worker
+# processes have caches of their own.
+CHDB_SOURCE_CACHE = None
+if get_chdb_config().source_cache_max_mb > 0 and get_chdb_config().process_pool_size == 0:
+    CHDB_SOURCE_CACHE = SourceCache(get_chdb_config().source_cache_max_mb * 1024 * 1024)
+
+
+def _fetch_chdb_result(client, query: str, deadline: float, arrow: bool = True) -> ChDBResult:
+    if isinstance(client, ChDBProcessPool):
+        return client.query(query, arrow, timeout=max(0.0, deadline - time.monotonic()))
+
+    def query_fn(sql: str, fmt: str):
+        # Waits for queries from other threads, which chDB runs one at a time, and
+        # has chDB stop the query if it runs past the deadline
+        return client.query(sql, fmt, timeout=max(0.0, deadline - time.monotonic()))
 
-        result_json = json.loads(result_data)
+    if CHDB_SOURCE_CACHE is not None:
+        query = CHDB_SOURCE_CACHE.rewrite(query, query_fn, deadline)
+    return fetch_result(query_fn, query, arrow)
 
-        return result_json.get("data", [])
 
+def execute_chdb_query(query: str, deadline: Optional[float] = None):
+    """Execute a query using chDB client.
+
+    The result is read as Arrow, and as JSON text if it has column types that Arrow
+    cannot represent faithfully. chDB stops the query at the deadline, a
+    time.monotonic() value that defaults to the query timeout from now.
+    """
+    client = create_chdb_client()
+    if deadline is None:
+        deadline = time.monotonic() + SELECT_QUERY_TIMEOUT_SECS
+    try:
+        try:
+            return result_to_rows(_fetch_chdb_result(client, query, deadline))
+        except ArrowUnsupportedError as e:
+            logger.debug(f"Reading chDB result as JSON: {e}")
+        return result_to_rows(_fetch_chdb_result(client, query, deadline, arrow=False))
     except Exception as err:
         logger.error(f"Error executing chDB query: {err}")
         return {"error": str(err)}
 
 
-def run_chdb_select_query(query: str):
+@instrument_tool
+async def run_chdb_select_query(query: str):
     """Run SQL in chDB, an in-process ClickHouse engine"""
     logger.info(f"Executing chDB SELECT query: {query}")
     try:
-        future = QUERY_EXECUTOR.submit(execute_chdb_query, query)
+        # The query is stopped when the call times out, including any time it waited
+        deadline = time.monotonic() + SELECT_QUERY_TIMEOUT_SECS
         try:
-            result = future.result(timeout=SELECT_QUERY_TIMEOUT_SECS)
+            result = await run_in_executor(
+                execute_chdb_query, query, deadline, timeout=SELECT_QUERY_TIMEOUT_SECS, pool="chdb"
+            )
+            if isinstance(result, dict) and CHDB_TIMEOUT_ERROR in result.get("error", ""):
+                # Stopped by chDB just before the call timed out
+                TOOL_TIMEOUTS.inc(tool="run_chdb_select_query")
+                raise asyncio.TimeoutError()
             # Check if we received an error structure from execute_chdb_query
             if isinstance(result, dict) and "error" in result:
                 logger.warning(f"chDB query failed: {result['error']}")
@@ -414,11 +1565,10 @@ def run_chdb_select_query(query: str):
                     "message": f"chDB query failed: {result['error']}",
                 }
             return result
-        except concurrent.futures.TimeoutError:
+        except asyncio.TimeoutError:
             logger.warning(
                 f"chDB query timed out after {SELECT_QUERY_TIMEOUT_SECS} seconds: {query}"
             )
-            future.cancel()
             return {
                 "status": "error",
                 "message": f"chDB query timed out after {SELECT_QUERY_TIMEOUT_SECS} seconds",
@@ -442,8 +1592,21 @@ def _init_chdb_client():
 
         client_config = get_chdb_config().get_client_config()
         data_path = client_config["data_path"]
+        process_pool_size = get_chdb_config().process_pool_size
+        if process_pool_size > 0:
+            logger.info(
+                f"Running chDB queries in {process_pool_size} worker processes "
+                f"with data_path={data_path}"
+            )
+            return ChDBProcessPool(
+                process_pool_size,
+                data_path,
+                get_chdb_config().worker_max_memory_mb * 1024 * 1024,
+                get_chdb_config().source_cache_max_mb * 1024 * 1024,
+            )
         logger.info(f"Creating chDB client with data_path={data_path}")
-        client = chs.Session(path=data_path)
+        client = SharedChDBSession(chs.Session(path=data_path))
+        client.query(DISABLE_COMPRESSION_SETTING)
         logger.info(f"Successfully connected to chDB with data_path={data_path}")
         return client
     except Exception as e:
@@ -453,9 +1616,11 @@ def _init_chdb_client():
 
 # Register tools based on configuration
 if os.getenv("CLICKHOUSE_ENABLED", "true").lower() == "true":
-    mcp.add_tool(Tool.from_function(list_databases))
-    mcp.add_tool(Tool.from_function(list_tables))
-    mcp.add_tool(Tool.from_function(run_select_query))
+    mcp.add_tool(Tool.from_function(list_databases, serializer=dumps))
+    mcp.add_tool(Tool.from_function(list_tables, serializer=dumps))
+    mcp.add_tool(Tool.from_function(describe_table, serializer=dumps))
+    mcp.add_tool(Tool.from_function(run_select_query, serializer=dumps))
+    mcp.add_tool(Tool.from_function(fetch_next_page, serializer=dumps))
     logger.info("ClickHouse tools registered")
 
 
@@ -464,7 +1629,7 @@ if os.getenv("CHDB_ENABLED", "false").lower() == "true":
     if _chdb_client:
         atexit.register(lambda: _chdb_client.close())
 
-    mcp.add_tool(Tool.from_function(run_chdb_select_query))
+    mcp.add_tool(Tool.from_function(run_chdb_select_query, serializer=dumps))
     chdb_prompt = Prompt.from_function(
         chdb_initial_prompt,
         name="chdb_initial_prompt",
@@ -0,0 +1,240 @@
+"""Prometheus metrics for the MCP tools.
+
+A small, dependency-free implementation of counters, histograms and callback
+gauges that renders the Prometheus text exposition format for the /metrics route.
+"""
+
+import contextvars
+import math
+import threading
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+ROW_BUCKETS = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+BYTE_BUCKETS = (1_024, 16_384, 131_072, 1_048_576, 10_485_760, 104_857_600)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels) + "}"
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A monotonically increasing count, per label combination."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = self.header()
+        for key, value in values:
+            labels = _format_labels(list(zip(self.labelnames, key)))
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, per label combination."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label key: (bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = [counts, total + value, count + 1]
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[2] if entry else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(c), s, n)) for key, (c, s, n) in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in values:
+            base = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(base + [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(base)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class CallbackGauge(_Metric):
+    """A gauge whose value is read from a callback at scrape time.
+
+    With labelnames, the callback returns a mapping from tuples of label values
+    to gauge values.
+    """
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Any],
+        labelnames: Sequence[str] = (),
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        if not self.labelnames:
+            return self.header() + [f"{self.name} {_format_value(self.callback())}"]
+        lines = self.header()
+        for key, value in sorted(self.callback().items()):
+            labels = _format_labels(list(zip(self.labelnames, key)))
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """A set of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Name of the tool being run, used to label work it hands to an executor
+current_tool: contextvars.ContextVar = contextvars.ContextVar(
+    "mcp_clickhouse_current_tool", default="other"
+)
+
+TOOL_CALLS = REGISTRY.register(
+    Counter("mcp_clickhouse_tool_calls_total", "Tool calls started.", ["tool"])
+)
+TOOL_ERRORS = REGISTRY.register(
+    Counter("mcp_clickhouse_tool_errors_total", "Tool calls that failed.", ["tool"])
+)
+TOOL_TIMEOUTS = REGISTRY.register(
+    Counter("mcp_clickhouse_tool_timeouts_total", "Tool calls that timed out.", ["tool"])
+)
+TOOL_REJECTIONS = REGISTRY.register(
+    Counter(
+        "mcp_clickhouse_tool_rejections_total",
+        "Tool calls rejected by admission control because the server was busy.",
+        ["tool"],
+    )
+)
+TOOL_DURATION = REGISTRY.register(
+    Histogram(
+        "mcp_clickhouse_tool_duration_seconds", "Total tool call latency in seconds.", ["tool"]
+    )
+)
+TOOL_QUEUE_WAIT = REGISTRY.register(
+    Histogram(
+        "mcp_clickhouse_tool_queue_wait_seconds",
+        "Time tool work waited for a free executor thread, in seconds.",
+        ["tool"],
+    )
+)
+TOOL_EXECUTION = REGISTRY.register(
+    Histogram(
+        "mcp_clickhouse_tool_execution_seconds",
+        "Time tool work ran on an executor thread, in seconds.",
+        ["tool"],
+    )
+)
+TOOL_ROWS = REGISTRY.register(
+    Histogram(
+        "mcp_clickhouse_tool_rows", "Rows or items returned per tool call.", ["tool"], ROW_BUCKETS
+    )
+)
+TOOL_RESPONSE_BYTES = REGISTRY.register(
+    Histogram(
+        "mcp_clickhouse_tool_response_bytes",
+        "Estimated serialized size of tool responses in bytes.",
+        ["tool"],
+        BYTE_BUCKETS,
+    )
+)
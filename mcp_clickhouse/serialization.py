@@ -0,0 +1,53 @@
+"""Fast JSON serialization of tool results.
+
+Tool results are serialized by compiled encoders instead of Python recursion:
+orjson if it is installed, otherwise pydantic-core, which FastMCP already depends
+on. Both handle dataclasses, datetimes, dates and UUIDs natively. Decimals, IP
+addresses and other ClickHouse values without a JSON type are written as strings.
+
+orjson cannot write integers outside the 64-bit range, such as Int128 and UInt256
+values, so results it rejects are written by pydantic-core instead. Either way,
+NaN and infinity are written as null, since JSON has no literal for them.
+"""
+
+from decimal import Decimal
+from typing import Any
+
+import pydantic_core
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# Map columns can have non-string keys
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+
+def _default(obj: Any):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode("utf-8", errors="replace")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return str(obj)
+
+
+def dumps(obj: Any) -> str:
+    """Serialize obj to compact JSON text."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS).decode()
+        except orjson.JSONEncodeError:
+            pass
+    return pydantic_core.to_json(obj, fallback=_default, inf_nan_mode="null").decode()
+
+
+def to_builtins(obj: Any) -> Any:
+    """Convert dataclasses and other values to JSON-compatible dicts, lists and scalars.
+
+    Unlike dataclasses.asdict(), values are not deep-copied, and the conversion runs
+    in compiled code.
+    """
+    return pydantic_core.to_jsonable_python(obj, fallback=_default, inf_nan_mode="null")
@@ -0,0 +1,65 @@
+"""Optional OpenTelemetry tracing.
+
+If the opentelemetry-api package is installed, tool calls, executor queue waits,
+client creation and ClickHouse queries are recorded as spans, and the trace id is
+sent to ClickHouse as the log_comment setting so that spans can be matched with
+system.query_log entries. Spans are only exported if the application configures
+an OpenTelemetry SDK. Without the package, every helper here is a no-op.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    from opentelemetry import trace
+except ImportError:  # pragma: no cover - depends on the environment
+    trace = None
+
+_tracer = trace.get_tracer("mcp_clickhouse") if trace else None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Run the body in a span that is the current span, recording any exception."""
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=_clean(attributes)) as current:
+        yield current
+
+
+def record_span(name: str, start_ns: int, end_ns: Optional[int] = None, **attributes) -> None:
+    """Record a span for an interval that has already been measured.
+
+    Used for time spent waiting, such as in the executor queue, where there is no
+    code to wrap in a span.
+    """
+    if _tracer is None:
+        return
+    started = _tracer.start_span(name, start_time=start_ns, attributes=_clean(attributes))
+    started.end(end_time=end_ns or time.time_ns())
+
+
+def current_trace_id() -> Optional[str]:
+    """Get the id of the current trace as 32 hex digits, or None outside of a trace."""
+    if trace is None:
+        return None
+    context = trace.get_current_span().get_span_context()
+    if not context.is_valid:
+        return None
+    return format(context.trace_id, "032x")
+
+
+def query_span(statement: str, query_id: Optional[str] = None):
+    """Span around a ClickHouse query, tagged with the database semantic conventions."""
+    return span(
+        "clickhouse.query",
+        **{"db.system": "clickhouse", "db.statement": statement, "db.clickhouse.query_id": query_id},
+    )
+
+
+def _clean(attributes: dict) -> dict:
+    # OpenTelemetry rejects None attribute values
+    return {key: value for key, value in attributes.items() if value is not None}
+
@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+
+from mcp_clickhouse.admission import AdmissionController, ServerBusyError
+
+
+class TestAdmissionController(unittest.TestCase):
+    def test_rejects_when_queue_is_full(self):
+        """Test that requests beyond the queue bound fail fast."""
+
+        async def scenario():
+            admission = AdmissionController(max_active=1, max_queued=1)
+            await admission.acquire("a")
+            waiter = asyncio.create_task(admission.acquire("b"))
+            await asyncio.sleep(0)
+            with self.assertRaises(ServerBusyError):
+                await admission.acquire("c")
+            admission.release("a")
+            await asyncio.wait_for(waiter, 1)
+            self.assertEqual(admission.stats()["rejected"], 1)
+            self.assertEqual(admission.stats()["active"], 1)
+
+        asyncio.run(scenario())
+
+    def test_per_client_limits(self):
+        """Test that one client cannot take every slot or every queue position."""
+
+        async def scenario():
+            admission = AdmissionController(
+                max_active=3, max_queued=10, max_active_per_client=1, max_queued_per_client=1
+            )
+            await admission.acquire("noisy")
+            queued = asyncio.create_task(admission.acquire("noisy"))
+            await asyncio.sleep(0)
+            with self.assertRaises(ServerBusyError):
+                await admission.acquire("noisy")
+            # Another client is admitted even though the noisy one has a queued request
+            await asyncio.wait_for(admission.acquire("quiet"), 1)
+            self.assertFalse(queued.done())
+            admission.release("noisy")
+            await asyncio.wait_for(queued, 1)
+
+        asyncio.run(scenario())
+
+    def test_weighted_fair_order(self):
+        """Test that waiting clients are served by weight rather than arrival order."""
+
+        async def scenario():
+            admission = AdmissionController(max_active=1, max_queued=10, weights={"b": 2})
+            await admission.acquire("holder")
+            order = []
+
+            async def request(client):
+                await admission.acquire(client)
+                order.append(client)
+                admission.release(client)
+
+            tasks = [asyncio.create_task(request(c)) for c in ["a", "a", "a", "b", "b", "b"]]
+            await asyncio.sleep(0)
+            admission.release("holder")
+            await asyncio.wait_for(asyncio.gather(*tasks), 1)
+            self.assertEqual(order, ["b", "a", "b", "b", "a", "a"])
+
+        asyncio.run(scenario())
+
+    def test_cancelled_waiter_gives_up_its_place(self):
+        """Test that a waiter that times out leaves the queue."""
+
+        async def scenario():
+            admission = AdmissionController(max_active=1, max_queued=5)
+            await admission.acquire("a")
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(admission.acquire("b"), 0.01)
+            self.assertEqual(admission.stats()["queued"], 0)
+            admission.release("a")
+            self.assertEqual(admission.stats()["active"], 0)
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import time
+import unittest
+
+from mcp_clickhouse.cache import TTLCache, is_deterministic_query, normalize_query
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_hit_and_miss(self):
+        """Test that stored values are returned and counted."""
+        cache = TTLCache(max_entries=4, ttl=60)
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", [1, 2])
+        self.assertEqual(cache.get("a"), [1, 2])
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted when the cache is full."""
+        cache = TTLCache(max_entries=2, ttl=60)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_stale_entry_revalidated_by_fingerprint(self):
+        """Test that a stale entry is reused while its fingerprint is unchanged."""
+        cache = TTLCache(max_entries=4, ttl=0.01)
+        cache.put("a", 1, fingerprint=(3, "t"))
+        time.sleep(0.02)
+        self.assertEqual(cache.get("a", lambda: (3, "t")), 1)
+        self.assertEqual(cache.stats()["revalidations"], 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a", lambda: (4, "t")))
+        self.assertEqual(len(cache), 0)
+
+    def test_stale_entry_without_fingerprint_expires(self):
+        """Test that a stale entry is dropped when it cannot be revalidated."""
+        cache = TTLCache(max_entries=4, ttl=0.01)
+        cache.put("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+
+    def test_byte_budget(self):
+        """Test that entries are evicted to stay within the byte budget."""
+        cache = TTLCache(max_entries=10, ttl=60, max_bytes=100)
+        cache.put("a", 1, size=60)
+        cache.put("b", 2, size=60)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["bytes"], 60)
+        cache.put("c", 3, size=200)
+        self.assertIsNone(cache.get("c"))
+        self.assertEqual(cache.get("b"), 2)
+
+    def test_disabled(self):
+        """Test that a cache without room stores nothing."""
+        cache = TTLCache(max_entries=0)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+
+class TestQueryKeys(unittest.TestCase):
+    def test_normalize_query(self):
+        """Test that formatting differences outside of string literals are ignored."""
+        self.assertEqual(
+            normalize_query("  SELECT  a,\n  b FROM t WHERE s = 'x  y' ;  "),
+            "SELECT a, b FROM t WHERE s = 'x  y'",
+        )
+
+    def test_is_deterministic_query(self):
+        """Test that time, random and system table queries are detected."""
+        self.assertTrue(is_deterministic_query("SELECT 'now()', random_id FROM t"))
+        self.assertFalse(is_deterministic_query("SELECT * FROM t WHERE d = today()"))
+        self.assertFalse(is_deterministic_query("SELECT rand() FROM t"))
+        self.assertFalse(is_deterministic_query("SELECT * FROM system.parts"))
+
+
+if __name__ == "__main__":
+    unittest.main()
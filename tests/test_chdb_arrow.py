@@ -0,0 +1,78 @@
+import unittest
+from decimal import Decimal
+
+import pyarrow
+
+from mcp_clickhouse.chdb_arrow import (
+    ArrowUnsupportedError,
+    arrow_to_rows,
+    check_arrow_types,
+    describe_query,
+    uses_session_timezone,
+)
+
+
+class TestChDBArrow(unittest.TestCase):
+    def test_check_arrow_types(self):
+        """Test that only types with a faithful Arrow form are accepted."""
+        check_arrow_types(
+            ["UInt64", "Nullable(String)", "Array(Array(Int32))", "Decimal(18, 2)", "Date"],
+            None,
+        )
+        check_arrow_types(["DateTime", "DateTime64(3)"], "Etc/UTC")
+        for clickhouse_type in ["UUID", "IPv4", "Enum8('a' = 1)", "Array(Date)", "Map(String, UInt8)"]:
+            with self.assertRaises(ArrowUnsupportedError, msg=clickhouse_type):
+                check_arrow_types([clickhouse_type], "UTC")
+        with self.assertRaises(ArrowUnsupportedError):
+            check_arrow_types(["DateTime"], "Asia/Tokyo")
+        with self.assertRaises(ArrowUnsupportedError):
+            check_arrow_types(["DateTime64(2)"], "UTC")
+
+    def test_uses_session_timezone(self):
+        """Test that only times without their own timezone need the session's."""
+        self.assertTrue(uses_session_timezone(["UInt8", "Nullable(DateTime)"]))
+        self.assertTrue(uses_session_timezone(["DateTime64(3)"]))
+        self.assertFalse(uses_session_timezone(["DateTime('UTC')", "DateTime64(3, 'UTC')"]))
+        self.assertFalse(uses_session_timezone(["Date", "String"]))
+
+    def test_arrow_to_rows_converts_as_json(self):
+        """Test that dates, times and decimals are converted to their JSON values."""
+        table = pyarrow.table(
+            {
+                "d": pyarrow.array([19723, None], pyarrow.uint16()),
+                "dt": pyarrow.array([1704070923, 0], pyarrow.uint32()),
+                "dt64": pyarrow.array([1704070923500, 0], pyarrow.timestamp("ms", tz="Etc/UTC")),
+                "dec": pyarrow.array([Decimal("1.50"), None], pyarrow.decimal128(18, 2)),
+                "n": pyarrow.array([7, 8], pyarrow.uint16()),
+            }
+        )
+        rows = arrow_to_rows(
+            table,
+            ["Nullable(Date)", "DateTime", "DateTime64(3)", "Decimal(18, 2)", "UInt16"],
+            "UTC",
+        )
+        self.assertEqual(
+            rows[0],
+            {
+                "d": "2024-01-01",
+                "dt": "2024-01-01 01:02:03",
+                "dt64": "2024-01-01 01:02:03.500",
+                "dec": 1.5,
+                "n": 7,
+            },
+        )
+        self.assertIsNone(rows[1]["d"])
+
+    def test_arrow_to_rows_checks_column_count(self):
+        """Test that a result that does not match its description is rejected."""
+        table = pyarrow.table({"a": [1]})
+        with self.assertRaises(ArrowUnsupportedError):
+            arrow_to_rows(table, ["UInt8", "UInt8"], None)
+
+    def test_describe_query(self):
+        """Test that a trailing semicolon does not end up inside DESCRIBE."""
+        self.assertEqual(describe_query(" SELECT 1; "), "DESCRIBE (SELECT 1)")
+
+
+if __name__ == "__main__":
+    unittest.main()
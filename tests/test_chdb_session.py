@@ -0,0 +1,72 @@
+import threading
+import time
+import unittest
+
+from mcp_clickhouse.chdb_session import ChDBBusyError, SharedChDBSession
+
+
+class SlowSession:
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.closed = False
+        self.settings = []
+
+    def query(self, sql, fmt="CSV"):
+        if sql.startswith("SET "):
+            self.settings.append(sql)
+            return None
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05)
+        self.running -= 1
+        return sql
+
+    def close(self):
+        self.closed = True
+
+
+class TestSharedChDBSession(unittest.TestCase):
+    def test_queries_take_turns(self):
+        """Test that concurrent queries run one at a time and all complete."""
+        inner = SlowSession()
+        session = SharedChDBSession(inner)
+        results = []
+        threads = [
+            threading.Thread(target=lambda i=i: results.append(session.query(f"SELECT {i}")))
+            for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(results), [f"SELECT {i}" for i in range(4)])
+        self.assertEqual(inner.max_running, 1)
+        self.assertEqual(session.stats()["queries"], 4)
+
+    def test_busy_timeout(self):
+        """Test that a query gives up when the session stays busy."""
+        session = SharedChDBSession(SlowSession())
+        worker = threading.Thread(target=session.query, args=("SELECT 1",))
+        worker.start()
+        time.sleep(0.01)
+        with self.assertRaises(ChDBBusyError):
+            session.query("SELECT 2", timeout=0.001)
+        worker.join()
+        session.close()
+        self.assertTrue(session.session.closed)
+
+    def test_timeout_limits_execution_time(self):
+        """Test that what is left of the timeout is passed to chDB, and reset without one."""
+        inner = SlowSession()
+        session = SharedChDBSession(inner)
+        session.query("SELECT 1", timeout=10)
+        self.assertRegex(inner.settings[-1], r"^SET max_execution_time = (9\.9\d\d|10\.000)$")
+        session.query("SELECT 2")
+        self.assertEqual(inner.settings[-1], "SET max_execution_time = 0")
+        session.query("SELECT 3")
+        self.assertEqual(len(inner.settings), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,212 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from mcp_clickhouse.chdb_sources import CACHE_DATABASE, SourceCache
+
+
+class Result:
+    def __init__(self, data):
+        self._data = data
+
+    def data(self):
+        return self._data
+
+
+class FakeSession:
+    """Records statements, and reports every cached table as table_bytes in size."""
+
+    def __init__(self, table_bytes=100, database_engine="Memory"):
+        self.table_bytes = table_bytes
+        self.database_engine = database_engine
+        self.statements = []
+
+    def query(self, sql, fmt):
+        self.statements.append(sql)
+        if sql.startswith("SELECT total_bytes"):
+            return Result(f"{self.table_bytes}\n")
+        if sql.startswith("SELECT engine"):
+            return Result(f'"{self.database_engine}"\n')
+        return Result("")
+
+    def created(self):
+        return [sql for sql in self.statements if sql.startswith("CREATE TABLE")]
+
+    def dropped(self):
+        return [sql for sql in self.statements if sql.startswith("DROP TABLE")]
+
+
+class TestSourceCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def write(self, name, content="a,b\n1,2\n"):
+        path = os.path.join(self.dir.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_repeat_queries_read_cached_table(self):
+        """Test that a source is loaded once and then read from its table."""
+        path = self.write("data.csv")
+        session = FakeSession()
+        cache = SourceCache(1000)
+        query = f"SELECT count() FROM file('{path}', 'CSVWithNames')"
+        first = cache.rewrite(query, session.query)
+        second = cache.rewrite(query, session.query)
+        self.assertEqual(first, second)
+        self.assertRegex(first, rf"^SELECT count\(\) FROM {CACHE_DATABASE}\.source_\w+$")
+        self.assertEqual(len(session.created()), 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_changed_source_is_reloaded(self):
+        """Test that a source is loaded again when the file changes."""
+        path = self.write("data.csv")
+        session = FakeSession()
+        cache = SourceCache(1000)
+        query = f"SELECT * FROM file('{path}')"
+        first = cache.rewrite(query, session.query)
+        self.write("data.csv", "a,b\n1,2\n3,4\n")
+        second = cache.rewrite(query, session.query)
+        self.assertNotEqual(first, second)
+        self.assertEqual(len(session.created()), 2)
+        self.assertEqual(len(session.dropped()), 1)
+
+    def test_least_recently_used_sources_are_evicted(self):
+        """Test that the cache drops the least recently used table to stay in budget."""
+        paths = [self.write(f"data{i}.csv") for i in range(3)]
+        session = FakeSession(table_bytes=100)
+        cache = SourceCache(250)
+        cache.rewrite(f"SELECT * FROM file('{paths[0]}')", session.query)
+        cache.rewrite(f"SELECT * FROM file('{paths[1]}')", session.query)
+        cache.rewrite(f"SELECT * FROM file('{paths[0]}')", session.query)
+        cache.rewrite(f"SELECT * FROM file('{paths[2]}')", session.query)
+        stats = cache.stats()
+        self.assertEqual((stats["sources"], stats["bytes"], stats["evictions"]), (2, 200, 1))
+        # data1 was evicted, data0 is still cached
+        cache.rewrite(f"SELECT * FROM file('{paths[0]}')", session.query)
+        self.assertEqual(cache.stats()["hits"], 2)
+
+    def test_oversized_source_is_not_cached(self):
+        """Test that a source larger than the cache is dropped and not loaded again."""
+        path = self.write("data.csv")
+        session = FakeSession(table_bytes=5000)
+        cache = SourceCache(1000)
+        query = f"SELECT * FROM file('{path}')"
+        self.assertEqual(cache.rewrite(query, session.query), query)
+        self.assertEqual(cache.rewrite(query, session.query), query)
+        self.assertEqual(len(session.created()), 1)
+        self.assertEqual(cache.stats()["sources"], 0)
+
+    def test_source_larger_than_cache_is_not_loaded(self):
+        """Test that a file larger than the cache is never loaded into a table."""
+        path = self.write("data.csv", "a,b\n" + "1,2\n" * 1000)
+        session = FakeSession()
+        cache = SourceCache(1000)
+        query = f"SELECT * FROM file('{path}')"
+        self.assertEqual(cache.rewrite(query, session.query), query)
+        self.assertEqual(session.created(), [])
+
+    def test_url_headers_are_read_outside_the_lock(self):
+        """Test that a slow URL does not hold up queries of other sources."""
+        path = self.write("data.csv")
+        session = FakeSession()
+        cache = SourceCache(1000)
+        requested = threading.Event()
+        release = threading.Event()
+
+        def slow_url_version(url, timeout):
+            requested.set()
+            release.wait(5)
+            return "v1", 10
+
+        with mock.patch("mcp_clickhouse.chdb_sources._url_version", slow_url_version):
+            url_query = threading.Thread(
+                target=cache.rewrite,
+                args=("SELECT * FROM url('http://example.com/data.csv')", session.query),
+            )
+            url_query.start()
+            self.assertTrue(requested.wait(5))
+            started_at = time.monotonic()
+            cache.rewrite(f"SELECT * FROM file('{path}')", session.query)
+            self.assertLess(time.monotonic() - started_at, 1)
+            release.set()
+            url_query.join()
+        self.assertEqual(len(session.created()), 2)
+
+    def test_url_headers_wait_until_deadline(self):
+        """Test that URL headers are only waited for until the query's deadline."""
+        session = FakeSession()
+        cache = SourceCache(1000)
+        query = "SELECT * FROM url('http://example.com/data.csv')"
+        with mock.patch("mcp_clickhouse.chdb_sources._url_version", return_value=None) as head:
+            cache.rewrite(query, session.query, deadline=time.monotonic() + 1)
+            self.assertLessEqual(head.call_args.args[1], 1)
+            cache.rewrite(query, session.query, deadline=time.monotonic() - 1)
+            self.assertEqual(head.call_count, 1)
+
+    def test_only_from_and_join_sources_are_replaced(self):
+        """Test that calls in literals, comments and expressions are left alone."""
+        path = self.write("data.csv")
+        session = FakeSession()
+        cache = SourceCache(1000)
+        for query in [
+            f"SELECT 'FROM file(\\'{path}\\')' AS s",
+            f"SELECT 1 -- FROM file('{path}')",
+            f"/* FROM file('{path}') */ SELECT 1",
+            f"SELECT length(file('{path}'))",
+        ]:
+            self.assertEqual(cache.rewrite(query, session.query), query)
+        self.assertEqual(session.created(), [])
+
+        query = f"SELECT * FROM numbers(1) AS n JOIN /* c */ file('{path}') AS f ON 1 -- x"
+        rewritten = cache.rewrite(query, session.query)
+        self.assertRegex(
+            rewritten,
+            rf"^SELECT \* FROM numbers\(1\) AS n JOIN /\* c \*/ {CACHE_DATABASE}\.source_\w+ "
+            r"AS f ON 1 -- x$",
+        )
+
+    def test_cache_database_is_not_dropped(self):
+        """Test that the cache creates its database if needed and never drops it."""
+        path = self.write("data.csv")
+        session = FakeSession()
+        cache = SourceCache(1000)
+        cache.rewrite(f"SELECT * FROM file('{path}')", session.query)
+        self.assertIn(
+            f"CREATE DATABASE IF NOT EXISTS {CACHE_DATABASE} ENGINE = Memory", session.statements
+        )
+        self.assertFalse(any(sql.startswith("DROP DATABASE") for sql in session.statements))
+        # Another cache in the same session names its tables differently
+        SourceCache(1000).rewrite(f"SELECT * FROM file('{path}')", session.query)
+        self.assertEqual(len(set(session.created())), 2)
+
+        session = FakeSession(database_engine="Atomic")
+        query = f"SELECT * FROM file('{path}')"
+        self.assertEqual(SourceCache(1000).rewrite(query, session.query), query)
+        self.assertEqual(session.created(), [])
+
+    def test_uncacheable_queries_are_unchanged(self):
+        """Test that globs, missing files, virtual columns, settings and writes are left alone."""
+        path = self.write("data.csv")
+        session = FakeSession()
+        cache = SourceCache(1000)
+        for query in [
+            f"SELECT * FROM file('{self.dir.name}/*.csv')",
+            "SELECT * FROM file('does_not_exist.csv')",
+            f"SELECT _path FROM file('{path}')",
+            f"SELECT * FROM file('{path}', 'CSVWithNames') SETTINGS format_csv_delimiter = ';'",
+            f"INSERT INTO FUNCTION file('{path}') SELECT 1",
+            "SELECT * FROM url('ftp://example.com/data.csv')",
+        ]:
+            self.assertEqual(cache.rewrite(query, session.query), query)
+        self.assertEqual(session.created(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,14 @@
+import asyncio
+import os
+import tempfile
+import time
 import unittest
+from unittest.mock import patch
 
 from dotenv import load_dotenv
 
 from mcp_clickhouse import create_chdb_client, run_chdb_select_query
+from mcp_clickhouse.chdb_sources import SourceCache
 
 load_dotenv()
 
@@ -16,14 +22,14 @@ class TestChDBTools(unittest.TestCase):
     def test_run_chdb_select_query_simple(self):
         """Test running a simple SELECT query in chDB."""
         query = "SELECT 1 as test_value"
-        result = run_chdb_select_query(query)
+        result = asyncio.run(run_chdb_select_query(query))
         self.assertIsInstance(result, list)
         self.assertIn("test_value", str(result))
 
     def test_run_chdb_select_query_with_url_table_function(self):
         """Test running a SELECT query with url table function in chDB."""
         query = "SELECT COUNT(1) FROM url('https://datasets.clickhouse.com/hits_compatible/athena_partitioned/hits_0.parquet', 'Parquet')"
-        result = run_chdb_select_query(query)
+        result = asyncio.run(run_chdb_select_query(query))
         print(result)
         self.assertIsInstance(result, list)
         self.assertIn("1000000", str(result))
@@ -31,16 +37,109 @@ class TestChDBTools(unittest.TestCase):
     def test_run_chdb_select_query_failure(self):
         """Test running a SELECT query with an error in chDB."""
         query = "SELECT * FROM non_existent_table_chDB"
-        result = run_chdb_select_query(query)
+        result = asyncio.run(run_chdb_select_query(query))
         print(result)
         self.assertIsInstance(result, dict)
         self.assertEqual(result["status"], "error")
         self.assertIn("message", result)
 
+    def test_run_chdb_select_query_types(self):
+        """Test that results read as Arrow match those read as JSON."""
+        query = (
+            "SELECT number AS n, toString(number) AS s, toDate('2024-01-01') + number AS d, "
+            "toDateTime('2024-01-01 01:02:03') AS dt, toDecimal64(1.5, 2) AS dec, [n] AS a "
+            "FROM numbers(3)"
+        )
+        result = asyncio.run(run_chdb_select_query(query))
+        self.assertEqual(len(result), 3)
+        self.assertEqual(
+            result[1],
+            {"n": 1, "s": "1", "d": "2024-01-02", "dt": "2024-01-01 01:02:03", "dec": 1.5, "a": [1]},
+        )
+
+    def test_run_chdb_select_query_json_fallback(self):
+        """Test that types without an Arrow form are read as JSON, and later queries work."""
+        query = "SELECT toUUID('00000000-0000-0000-0000-000000000001') AS u, toIPv4('1.2.3.4') AS ip"
+        result = asyncio.run(run_chdb_select_query(query))
+        self.assertEqual(result, [{"u": "00000000-0000-0000-0000-000000000001", "ip": "1.2.3.4"}])
+        self.assertEqual(asyncio.run(run_chdb_select_query("SELECT 2 AS a")), [{"a": 2}])
+
+    def test_run_chdb_select_query_timeout_stops_query(self):
+        """Test that chDB stops a query once it overruns the timeout."""
+        query = "SELECT count() FROM numbers(100000000000) WHERE sipHash64(number) = 1"
+        started_at = time.monotonic()
+        with patch("mcp_clickhouse.mcp_server.SELECT_QUERY_TIMEOUT_SECS", 1):
+            result = asyncio.run(run_chdb_select_query(query))
+        self.assertEqual(result["status"], "error")
+        self.assertIn("timed out", result["message"])
+        # The engine is free again right away
+        self.assertLess(time.monotonic() - started_at, 5)
+        self.assertEqual(asyncio.run(run_chdb_select_query("SELECT 3 AS a")), [{"a": 3}])
+        self.assertLess(time.monotonic() - started_at, 5)
+
+    def test_run_chdb_select_query_does_not_block_event_loop(self):
+        """Test that other coroutines make progress while a chDB query runs."""
+        ticks = []
+
+        async def tick():
+            while len(ticks) < 20:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.05)
+
+        async def run():
+            query = "SELECT sleepEachRow(1) FROM numbers(2) SETTINGS max_block_size = 1"
+            return await asyncio.gather(run_chdb_select_query(query), tick())
+
+        started_at = time.monotonic()
+        result, _ = asyncio.run(run())
+        self.assertEqual(len(result), 2)
+        # The ticks kept coming while the query was still running
+        self.assertEqual(len(ticks), 20)
+        self.assertLess(ticks[-1] - started_at, 1.5)
+
+    def test_run_chdb_select_query_source_cache(self):
+        """Test that file() sources are read from the cache until the file changes."""
+        cache = SourceCache(64 * 1024 * 1024)
+        with tempfile.TemporaryDirectory() as directory, patch(
+            "mcp_clickhouse.mcp_server.CHDB_SOURCE_CACHE", cache
+        ):
+            path = os.path.join(directory, "data.csv")
+            with open(path, "w") as f:
+                f.write("a,b\n1,x\n2,y\n")
+            query = f"SELECT a, b FROM file('{path}', 'CSVWithNames') ORDER BY a"
+            expected = [{"a": 1, "b": "x"}, {"a": 2, "b": "y"}]
+            self.assertEqual(asyncio.run(run_chdb_select_query(query)), expected)
+            self.assertEqual(asyncio.run(run_chdb_select_query(query)), expected)
+            self.assertEqual(cache.stats()["hits"], 1)
+            with open(path, "a") as f:
+                f.write("3,z\n")
+            self.assertEqual(len(asyncio.run(run_chdb_select_query(query))), 3)
+            self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_run_chdb_select_query_source_cache_settings(self):
+        """Test that a query's settings apply to its source instead of a cached table."""
+        cache = SourceCache(64 * 1024 * 1024)
+        with tempfile.TemporaryDirectory() as directory, patch(
+            "mcp_clickhouse.mcp_server.CHDB_SOURCE_CACHE", cache
+        ):
+            path = os.path.join(directory, "data.csv")
+            with open(path, "w") as f:
+                f.write("a;b\n1;x\n")
+            query = (
+                f"SELECT * FROM file('{path}', 'CSVWithNames') SETTINGS format_csv_delimiter = ';'"
+            )
+            expected = [{"a": 1, "b": "x"}]
+            self.assertEqual(asyncio.run(run_chdb_select_query(query)), expected)
+            self.assertEqual(asyncio.run(run_chdb_select_query(query)), expected)
+            self.assertEqual(cache.stats()["sources"], 0)
+            # A later query without the settings is not served a table read with them
+            query = f"SELECT * FROM file('{path}', 'CSVWithNames')"
+            self.assertEqual(asyncio.run(run_chdb_select_query(query)), [{"a;b": "1;x"}])
+
     def test_run_chdb_select_query_empty_result(self):
         """Test running a SELECT query that returns empty result in chDB."""
         query = "SELECT 1 WHERE 1 = 0"
-        result = run_chdb_select_query(query)
+        result = asyncio.run(run_chdb_select_query(query))
         print(result)
         self.assertIsInstance(result, list)
         self.assertEqual(len(result), 0)
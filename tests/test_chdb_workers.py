@@ -0,0 +1,105 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+from mcp_clickhouse.chdb_arrow import result_to_rows
+from mcp_clickhouse.chdb_workers import ChDBProcessPool, ChDBWorkerTimeoutError
+from mcp_clickhouse.mcp_env import get_chdb_config
+
+
+class TestChDBProcessPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = ChDBProcessPool(2, ":memory:")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_query(self):
+        """Test that results come back from a worker as Arrow and as JSON."""
+        query = "SELECT number AS n, toDate('2024-01-01') + number AS d FROM numbers(3)"
+        arrow_result = self.pool.query(query, timeout=60)
+        self.assertIsNotNone(arrow_result.column_types)
+        json_result = self.pool.query(query, arrow=False, timeout=60)
+        self.assertIsNone(json_result.column_types)
+        self.assertEqual(result_to_rows(arrow_result), result_to_rows(json_result))
+        self.assertEqual(result_to_rows(arrow_result)[2], {"n": 2, "d": "2024-01-03"})
+
+    def test_query_error(self):
+        """Test that a failing query raises, and leaves the worker usable."""
+        with self.assertRaises(RuntimeError):
+            self.pool.query("SELECT * FROM non_existent_table_chDB", timeout=60)
+        self.assertEqual(result_to_rows(self.pool.query("SELECT 1 AS a", timeout=60)), [{"a": 1}])
+
+    def run_concurrently(self, query):
+        threads = [
+            threading.Thread(target=self.pool.query, args=(query,), kwargs={"timeout": 60})
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_queries_run_in_parallel(self):
+        """Test that queries in different workers overlap."""
+        # Starts both workers
+        self.run_concurrently("SELECT 1")
+        started_at = time.monotonic()
+        self.run_concurrently("SELECT sleep(1)")
+        self.assertLess(time.monotonic() - started_at, 1.9)
+
+    def test_timeout_stops_query(self):
+        """Test that chDB stops a query overrunning its timeout, and keeps the worker."""
+        self.pool.query("SELECT 1", timeout=60)
+        started_at = time.monotonic()
+        with self.assertRaisesRegex(RuntimeError, "TIMEOUT_EXCEEDED"):
+            self.pool.query(
+                "SELECT count() FROM numbers(100000000000) WHERE sipHash64(number) = 1",
+                timeout=0.5,
+            )
+        self.assertLess(time.monotonic() - started_at, 5)
+        self.assertEqual(result_to_rows(self.pool.query("SELECT 2 AS a", timeout=60)), [{"a": 2}])
+
+    def test_timeout_kills_worker(self):
+        """Test that a worker that does not stop its query in time is killed."""
+        self.pool.query("SELECT 1", timeout=60)
+        with mock.patch("mcp_clickhouse.chdb_workers.WORKER_KILL_GRACE_SECS", 0):
+            with self.assertRaises(ChDBWorkerTimeoutError):
+                self.pool.query("SELECT sleep(3)", timeout=0.5)
+        self.assertEqual(self.pool.stats()["free"], 2)
+        self.assertEqual(result_to_rows(self.pool.query("SELECT 2 AS a", timeout=60)), [{"a": 2}])
+
+    def test_worker_does_not_import_server(self):
+        """Test that the workers' entry point leaves the server unloaded."""
+        code = (
+            "import sys, mcp_clickhouse.chdb_worker; "
+            "print('mcp_clickhouse.mcp_server' in sys.modules)"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        self.assertEqual(result.stdout.strip(), "False", result.stderr)
+
+    def test_memory_threshold_minimum(self):
+        """Test that a memory threshold below an idle worker's size is rejected."""
+        with mock.patch.dict(os.environ, {"CHDB_WORKER_MAX_MEMORY_MB": "256"}):
+            with self.assertRaises(ValueError):
+                get_chdb_config().worker_max_memory_mb
+        with mock.patch.dict(os.environ, {"CHDB_WORKER_MAX_MEMORY_MB": "0"}):
+            self.assertEqual(get_chdb_config().worker_max_memory_mb, 0)
+
+    def test_workers_recycled_over_memory_threshold(self):
+        """Test that a worker over the memory threshold is replaced after its query."""
+        pool = ChDBProcessPool(1, ":memory:", max_memory_bytes=1)
+        self.addCleanup(pool.close)
+        pool.query("SELECT 1", timeout=60)
+        pool.query("SELECT 1", timeout=60)
+        self.assertEqual(pool.stats()["recycled"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
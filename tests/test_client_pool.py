@@ -0,0 +1,112 @@
+import os
+import threading
+import unittest
+from unittest import mock
+
+from clickhouse_connect.driver.exceptions import DatabaseError, OperationalError
+
+from mcp_clickhouse.client_pool import ClickHousePool, PoolTimeoutError
+from mcp_clickhouse.mcp_env import get_config
+
+
+class FakeClient:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.closed = False
+
+    def ping(self):
+        return self.healthy
+
+    def close(self):
+        self.closed = True
+
+
+class TestClickHousePool(unittest.TestCase):
+    def make_pool(self, **kwargs):
+        self.created = []
+
+        def factory():
+            client = FakeClient()
+            self.created.append(client)
+            return client
+
+        return ClickHousePool({"host": "localhost"}, factory=factory, **kwargs)
+
+    def test_reuses_released_client(self):
+        """Test that a released client is handed out again instead of creating a new one."""
+        pool = self.make_pool(max_size=2)
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(pool.stats()["checkouts"], 2)
+
+    def test_bounded_size_times_out(self):
+        """Test that the pool never grows past max_size."""
+        pool = self.make_pool(max_size=1)
+        client = pool.acquire()
+        with self.assertRaises(PoolTimeoutError):
+            pool.acquire(timeout=0.05)
+        self.assertEqual(pool.stats()["timeouts"], 1)
+        pool.release(client)
+        self.assertIs(pool.acquire(timeout=0.05), client)
+
+    def test_waiter_receives_released_client(self):
+        """Test that a waiting caller is woken when a client is released."""
+        pool = self.make_pool(max_size=1)
+        client = pool.acquire()
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(pool.acquire(timeout=5)))
+        waiter.start()
+        pool.release(client)
+        waiter.join(5)
+        self.assertEqual(acquired, [client])
+
+    def test_connection_error_evicts_client(self):
+        """Test that a client raising a transport error is evicted."""
+        pool = self.make_pool(max_size=1)
+        with self.assertRaises(OperationalError):
+            with pool.connection() as client:
+                raise OperationalError("connection reset")
+        self.assertTrue(client.closed)
+        self.assertEqual(pool.stats()["evicted"], 1)
+        with pool.connection() as replacement:
+            self.assertIsNot(replacement, client)
+
+    def test_query_error_keeps_client(self):
+        """Test that a server-side query error does not evict the client."""
+        pool = self.make_pool(max_size=1)
+        with self.assertRaises(DatabaseError):
+            with pool.connection() as client:
+                raise DatabaseError("Unknown table")
+        self.assertFalse(client.closed)
+        self.assertEqual(pool.stats()["idle"], 1)
+
+    def test_idle_health_check_evicts_unhealthy_client(self):
+        """Test that idle clients are pinged and replaced when the ping fails."""
+        pool = self.make_pool(max_size=1, idle_check_secs=0)
+        with pool.connection() as client:
+            client.healthy = False
+        with pool.connection() as replacement:
+            self.assertIsNot(replacement, client)
+        stats = pool.stats()
+        self.assertEqual(stats["health_failures"], 1)
+        self.assertEqual(stats["created"], 2)
+
+    def test_default_size_covers_open_cursors(self):
+        """Test that the default pool size has a client for every open cursor."""
+        env = {
+            "CLICKHOUSE_THREAD_POOL_SIZE": "3",
+            "CLICKHOUSE_METADATA_THREAD_POOL_SIZE": "2",
+            "CLICKHOUSE_HEALTH_THREAD_POOL_SIZE": "1",
+            "CLICKHOUSE_CURSOR_MAX_OPEN": "4",
+        }
+        with mock.patch.dict(os.environ, env):
+            os.environ.pop("CLICKHOUSE_POOL_SIZE", None)
+            self.assertEqual(get_config().pool_size, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import threading
+import time
+import unittest
+
+from mcp_clickhouse.health import HealthCheck
+
+
+class TestHealthCheck(unittest.TestCase):
+    def test_result_is_cached(self):
+        """Test that the probe runs once per ttl window."""
+        calls = []
+        check = HealthCheck(lambda: calls.append(1) or "ok", ttl=60)
+        self.assertIsNone(check.cached())
+        self.assertEqual(check.status().message, "ok")
+        self.assertTrue(check.status().healthy)
+        self.assertEqual(check.cached().message, "ok")
+        self.assertEqual(len(calls), 1)
+        check.clear()
+        check.status()
+        self.assertEqual(len(calls), 2)
+
+    def test_failure_is_reported(self):
+        """Test that a probe that raises gives an unhealthy status."""
+
+        def probe():
+            raise ConnectionError("refused")
+
+        status = HealthCheck(probe, ttl=60).status()
+        self.assertFalse(status.healthy)
+        self.assertEqual(status.message, "refused")
+
+    def test_concurrent_callers_share_one_probe(self):
+        """Test that callers arriving during a probe wait for its result."""
+        calls = []
+
+        def probe():
+            calls.append(1)
+            time.sleep(0.1)
+            return "ok"
+
+        check = HealthCheck(probe, ttl=60)
+        threads = [threading.Thread(target=check.status) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,7 @@ import pytest_asyncio
 from fastmcp import Client
 from fastmcp.exceptions import ToolError
 import asyncio
-from mcp_clickhouse.mcp_server import mcp, create_clickhouse_client
+from mcp_clickhouse.mcp_server import METADATA_CACHE, mcp, create_clickhouse_client
 from dotenv import load_dotenv
 import json
 
@@ -81,6 +81,12 @@ async def setup_test_database():
     client.command(f"DROP DATABASE IF EXISTS {test_db}")
 
 
+@pytest.fixture(autouse=True)
+def clear_metadata_cache():
+    """Drop cached metadata, since the tests change schemas behind the server's back."""
+    METADATA_CACHE.clear()
+
+
 @pytest.fixture
 def mcp_server():
     """Return the MCP server instance for testing."""
@@ -105,6 +111,19 @@ async def test_list_databases(mcp_server, setup_test_database):
         assert "system" in databases  # System database should always exist
 
 
+@pytest.mark.asyncio
+async def test_tool_results_are_compact_json(mcp_server, setup_test_database):
+    """Test that tool results are encoded by the server's compact JSON serializer."""
+    test_db, _, _ = setup_test_database
+
+    async with Client(mcp_server) as client:
+        result = await client.call_tool("list_tables", {"database": test_db})
+
+        text = result[0].text
+        assert "\n" not in text
+        assert text == json.dumps(json.loads(text), separators=(",", ":"), ensure_ascii=False)
+
+
 @pytest.mark.asyncio
 async def test_list_tables_basic(mcp_server, setup_test_database):
     """Test the list_tables tool without filters."""
@@ -363,3 +382,31 @@ async def test_concurrent_queries(mcp_server, setup_test_database):
             query_result = json.loads(result[0].text)
             assert "rows" in query_result
             assert len(query_result["rows"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_run_select_query_paginated(mcp_server, setup_test_database):
+    """Test paging through a result with page_size and fetch_next_page."""
+    test_db, test_table, _ = setup_test_database
+
+    async with Client(mcp_server) as client:
+        query = f"SELECT id, name FROM {test_db}.{test_table} ORDER BY id"
+        result = await client.call_tool("run_select_query", {"query": query, "page_size": 3})
+        first_page = json.loads(result[0].text)
+
+        assert first_page["columns"] == ["id", "name"]
+        assert [row[0] for row in first_page["rows"]] == [1, 2, 3]
+        assert first_page["next_cursor"]
+
+        result = await client.call_tool(
+            "fetch_next_page", {"cursor": first_page["next_cursor"]}
+        )
+        second_page = json.loads(result[0].text)
+
+        assert [row[0] for row in second_page["rows"]] == [4]
+        assert second_page["next_cursor"] is None
+
+        # The cursor is closed once all rows have been read
+        with pytest.raises(ToolError) as exc_info:
+            await client.call_tool("fetch_next_page", {"cursor": first_page["next_cursor"]})
+        assert "Cursor not found" in str(exc_info.value)
@@ -0,0 +1,49 @@
+import unittest
+
+from mcp_clickhouse.metrics import CallbackGauge, Counter, Histogram, MetricsRegistry
+
+
+class TestMetrics(unittest.TestCase):
+    def test_counter_render(self):
+        """Test that counters are rendered per label combination."""
+        registry = MetricsRegistry()
+        calls = registry.register(Counter("calls_total", "Calls.", ["tool"]))
+        calls.inc(tool="list_tables")
+        calls.inc(2, tool="list_tables")
+        calls.inc(tool='a"b')
+        text = registry.render()
+        self.assertIn("# TYPE calls_total counter", text)
+        self.assertIn('calls_total{tool="list_tables"} 3', text)
+        self.assertIn('calls_total{tool="a\\"b"} 1', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that histogram buckets, sum and count follow the Prometheus format."""
+        registry = MetricsRegistry()
+        latency = registry.register(Histogram("latency_seconds", "Latency.", ["tool"], (0.1, 1)))
+        latency.observe(0.05, tool="t")
+        latency.observe(0.5, tool="t")
+        latency.observe(5, tool="t")
+        lines = registry.render().splitlines()
+        self.assertIn('latency_seconds_bucket{tool="t",le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{tool="t",le="1"} 2', lines)
+        self.assertIn('latency_seconds_bucket{tool="t",le="+Inf"} 3', lines)
+        self.assertIn('latency_seconds_sum{tool="t"} 5.55', lines)
+        self.assertIn('latency_seconds_count{tool="t"} 3', lines)
+
+    def test_callback_gauge_and_labels(self):
+        """Test that callback gauges are read at render time and labels are checked."""
+        registry = MetricsRegistry()
+        registry.register(CallbackGauge("queue_depth", "Queue depth.", lambda: 4))
+        registry.register(
+            CallbackGauge("workers", "Workers.", lambda: {("query",): 2, ("health",): 1}, ["pool"])
+        )
+        text = registry.render()
+        self.assertIn("queue_depth 4", text)
+        self.assertIn('workers{pool="health"} 1', text)
+        self.assertIn('workers{pool="query"} 2', text)
+        with self.assertRaises(ValueError):
+            Counter("c", "C.", ["tool"]).inc(other="x")
+
+
+if __name__ == "__main__":
+    unittest.main()
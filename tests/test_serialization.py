@@ -0,0 +1,64 @@
+import datetime
+import ipaddress
+import json
+import unittest
+import uuid
+from dataclasses import asdict
+from decimal import Decimal
+
+from mcp_clickhouse.mcp_server import Column, Table
+from mcp_clickhouse.serialization import dumps, to_builtins
+
+
+def make_table():
+    column = Column("db", "t", "id", "UInt32", "", "", "Primary identifier")
+    return Table(
+        "db", "t", "MergeTree", "CREATE TABLE db.t", [], [], "MergeTree", "id", "id", 3, 1024,
+        "Test table", [column],
+    )
+
+
+class TestSerialization(unittest.TestCase):
+    def test_dumps_clickhouse_values(self):
+        """Test that values without a JSON type are written as strings."""
+        value_id = uuid.UUID("350543d4-3e84-48ce-a153-448735395b54")
+        row = [
+            Decimal("1.50"),
+            ipaddress.ip_address("10.0.0.1"),
+            value_id,
+            datetime.datetime(2024, 1, 2, 3, 4, 5),
+            datetime.date(2024, 1, 2),
+            b"raw",
+            {1: "a"},
+        ]
+        self.assertEqual(
+            json.loads(dumps(row)),
+            [
+                "1.50",
+                "10.0.0.1",
+                str(value_id),
+                "2024-01-02T03:04:05",
+                "2024-01-02",
+                "raw",
+                {"1": "a"},
+            ],
+        )
+
+    def test_dumps_big_integers_and_nan(self):
+        """Test that 128 and 256-bit integers are written, and NaN and infinity as null."""
+        row = [2**127 - 1, 2**256 - 1, -(2**255), float("nan"), float("inf"), 1.5]
+        self.assertEqual(
+            json.loads(dumps(row)),
+            [2**127 - 1, 2**256 - 1, -(2**255), None, None, 1.5],
+        )
+        self.assertEqual(to_builtins([float("nan")]), [None])
+
+    def test_dataclasses_match_asdict(self):
+        """Test that dataclasses convert to the same dicts as dataclasses.asdict()."""
+        table = make_table()
+        self.assertEqual(to_builtins([table]), [asdict(table)])
+        self.assertEqual(json.loads(dumps(table)), asdict(table))
+
+
+if __name__ == "__main__":
+    unittest.main()
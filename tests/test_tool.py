@@ -1,10 +1,40 @@
+import asyncio
+import os
+import threading
+import tempfile
 import unittest
 import json
+import uuid
+from unittest import mock
 
 from dotenv import load_dotenv
+from clickhouse_connect.driver.httpclient import HttpClient
 from fastmcp.exceptions import ToolError
+from starlette.testclient import TestClient
 
-from mcp_clickhouse import create_clickhouse_client, list_databases, list_tables, run_select_query
+from mcp_clickhouse import (
+    create_clickhouse_client,
+    describe_table,
+    get_clickhouse_pool,
+    list_databases,
+    list_tables,
+    run_select_query,
+)
+from mcp_clickhouse.main import COMPRESSION_MINIMUM_SIZE, http_app
+from mcp_clickhouse.mcp_server import (
+    EXECUTORS,
+    HEALTH,
+    METADATA_CACHE,
+    QUERY_CURSORS,
+    SELECT_QUERY_TIMEOUT_SECS,
+    build_query_settings,
+    fetch_next_page,
+    kill_query,
+    mcp,
+    readonly_level,
+    result_to_column,
+    table_fingerprint,
+)
 
 load_dotenv()
 
@@ -35,6 +65,8 @@ class TestClickhouseTools(unittest.TestCase):
         cls.client.command(f"""
             INSERT INTO {cls.test_db}.{cls.test_table} (id, name) VALUES (1, 'Alice'), (2, 'Bob')
         """)
+        # The schema changed behind the server's back, so drop cached metadata
+        METADATA_CACHE.clear()
 
     @classmethod
     def tearDownClass(cls):
@@ -43,47 +75,379 @@ class TestClickhouseTools(unittest.TestCase):
 
     def test_list_databases(self):
         """Test listing databases."""
-        result = list_databases()
+        result = asyncio.run(list_databases())
         # Parse JSON response
         databases = json.loads(result)
         self.assertIn(self.test_db, databases)
 
     def test_list_tables_without_like(self):
         """Test listing tables without a 'LIKE' filter."""
-        result = list_tables(self.test_db)
+        result = asyncio.run(list_tables(self.test_db))
         self.assertIsInstance(result, list)
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0]["name"], self.test_table)
 
     def test_list_tables_with_like(self):
         """Test listing tables with a 'LIKE' filter."""
-        result = list_tables(self.test_db, like=f"{self.test_table}%")
+        result = asyncio.run(list_tables(self.test_db, like=f"{self.test_table}%"))
         self.assertIsInstance(result, list)
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0]["name"], self.test_table)
 
+    def test_list_tables_summary_only(self):
+        """Test that summary_only leaves out columns and DDL."""
+        result = asyncio.run(list_tables(self.test_db, summary_only=True))
+        self.assertEqual(len(result), 1)
+        self.assertEqual(
+            set(result[0]), {"database", "name", "engine", "total_rows", "total_bytes", "comment"}
+        )
+        self.assertEqual(result[0]["name"], self.test_table)
+        self.assertEqual(result[0]["engine"], "MergeTree")
+        self.assertEqual(result[0]["comment"], "Test table for unit testing")
+
+    def test_list_tables_filters_and_pages(self):
+        """Test engine, row count and name filters, and paging through tables by name."""
+        database = "test_tool_pages_db"
+        self.client.command(f"CREATE DATABASE IF NOT EXISTS {database}")
+        try:
+            for name in ("events_a", "events_b", "events_c"):
+                self.client.command(
+                    f"CREATE TABLE IF NOT EXISTS {database}.{name} (id UInt32) "
+                    "ENGINE = MergeTree ORDER BY id"
+                )
+            self.client.command(f"INSERT INTO {database}.events_b VALUES (1), (2)")
+            self.client.command(
+                f"CREATE TABLE IF NOT EXISTS {database}.logs (id UInt32) ENGINE = Memory"
+            )
+
+            def names(tables):
+                return [table["name"] for table in tables]
+
+            result = asyncio.run(list_tables(database, engine="MergeTree", summary_only=True))
+            self.assertEqual(names(result), ["events_a", "events_b", "events_c"])
+            result = asyncio.run(list_tables(database, min_rows=1, summary_only=True))
+            self.assertEqual(names(result), ["events_b"])
+            result = asyncio.run(list_tables(database, name_regex="^(logs|events_c)$"))
+            self.assertEqual(names(result), ["events_c", "logs"])
+
+            first = asyncio.run(list_tables(database, limit=3))
+            self.assertEqual(names(first["tables"]), ["events_a", "events_b", "events_c"])
+            self.assertEqual(first["tables"][0]["columns"][0]["name"], "id")
+            self.assertEqual(first["next_cursor"], "events_c")
+            last = asyncio.run(list_tables(database, limit=3, cursor=first["next_cursor"]))
+            self.assertEqual(names(last["tables"]), ["logs"])
+            self.assertIsNone(last["next_cursor"])
+        finally:
+            self.client.command(f"DROP DATABASE IF EXISTS {database}")
+
+    def test_describe_table(self):
+        """Test describing a single table with its columns and DDL."""
+        result = asyncio.run(describe_table(self.test_db, self.test_table))
+        self.assertEqual(result["name"], self.test_table)
+        self.assertIn("CREATE TABLE", result["create_table_query"])
+        self.assertEqual([c["name"] for c in result["columns"]], ["id", "name"])
+        self.assertEqual(result["columns"][0]["comment"], "Primary identifier")
+        with self.assertRaises(ToolError):
+            asyncio.run(describe_table(self.test_db, "missing_table"))
+
+    def test_list_tables_cached(self):
+        """Test that repeated table lookups are served from the metadata cache."""
+        METADATA_CACHE.clear()
+        first = asyncio.run(list_tables(self.test_db))
+        hits = METADATA_CACHE.stats()["hits"]
+        second = asyncio.run(list_tables(self.test_db))
+        self.assertEqual(second, first)
+        self.assertEqual(METADATA_CACHE.stats()["hits"], hits + 1)
+
+    def test_list_tables_revalidated_after_insert(self):
+        """Test that inserting rows invalidates a stale entry, with one fingerprint query."""
+        table = "insert_table"
+        self.client.command(
+            f"CREATE TABLE {self.test_db}.{table} (id UInt32) ENGINE = MergeTree() ORDER BY id"
+        )
+        self.addCleanup(self.client.command, f"DROP TABLE {self.test_db}.{table}")
+        like = "insert_%"
+        with mock.patch.object(METADATA_CACHE, "ttl", 0), mock.patch(
+            "mcp_clickhouse.mcp_server.table_fingerprint", wraps=table_fingerprint
+        ) as fingerprint:
+            self.assertEqual(asyncio.run(list_tables(self.test_db, like))[0]["total_rows"], 0)
+            self.client.command(f"INSERT INTO {self.test_db}.{table} VALUES (1), (2)")
+            fingerprint.reset_mock()
+            self.assertEqual(asyncio.run(list_tables(self.test_db, like))[0]["total_rows"], 2)
+            self.assertEqual(fingerprint.call_count, 1)
+
+    def test_list_tables_while_query_pool_is_busy(self):
+        """Test that metadata lookups do not wait behind queries holding every query thread."""
+        METADATA_CACHE.clear()
+        release = threading.Event()
+        query_pool = EXECUTORS["query"]
+        blockers = [query_pool.submit(release.wait, 30) for _ in range(query_pool.max_workers)]
+        try:
+            result = asyncio.run(list_tables(self.test_db))
+            self.assertEqual(len(result), 1)
+        finally:
+            release.set()
+            for blocker in blockers:
+                blocker.result()
+
     def test_run_select_query_success(self):
         """Test running a SELECT query successfully."""
         query = f"SELECT * FROM {self.test_db}.{self.test_table}"
-        result = run_select_query(query)
+        result = asyncio.run(run_select_query(query))
         self.assertIsInstance(result, dict)
         self.assertEqual(len(result["rows"]), 2)
         self.assertEqual(result["rows"][0][0], 1)
         self.assertEqual(result["rows"][0][1], "Alice")
 
+    def test_run_select_query_sends_id_and_time_limit(self):
+        """Test that a query is sent with a generated query_id and max_execution_time."""
+        query = f"SELECT id FROM {self.test_db}.{self.test_table}"
+        with mock.patch.object(
+            HttpClient,
+            "query_row_block_stream",
+            autospec=True,
+            side_effect=HttpClient.query_row_block_stream,
+        ) as stream:
+            asyncio.run(run_select_query(query))
+        settings = stream.call_args.kwargs["settings"]
+        self.assertEqual(str(uuid.UUID(settings["query_id"])), settings["query_id"])
+        self.assertEqual(settings["max_execution_time"], SELECT_QUERY_TIMEOUT_SECS)
+
+    def test_run_select_query_timeout_kills_query(self):
+        """Test that a query that times out is killed on the server by its query_id."""
+        killed = threading.Event()
+        with mock.patch.object(
+            HttpClient,
+            "query_row_block_stream",
+            autospec=True,
+            side_effect=HttpClient.query_row_block_stream,
+        ) as stream, mock.patch(
+            "mcp_clickhouse.mcp_server.kill_query", side_effect=lambda _: killed.set()
+        ) as kill, mock.patch("mcp_clickhouse.mcp_server.SELECT_QUERY_TIMEOUT_SECS", 0.2):
+            with self.assertRaises(ToolError):
+                asyncio.run(run_select_query("SELECT sleep(1)"))
+            self.assertTrue(killed.wait(5))
+        kill.assert_called_once_with(stream.call_args.kwargs["settings"]["query_id"])
+
+        client = mock.Mock()
+        with mock.patch("mcp_clickhouse.mcp_server.spare_connection") as spare:
+            spare.return_value.__enter__.return_value = client
+            kill_query("4f1c2c1e-0000-4000-8000-000000000000")
+        client.command.assert_called_once_with(
+            "KILL QUERY WHERE query_id = '4f1c2c1e-0000-4000-8000-000000000000' ASYNC"
+        )
+
+    def test_run_select_query_truncated(self):
+        """Test that results over the row budget are truncated and flagged."""
+        query = f"SELECT * FROM {self.test_db}.{self.test_table} ORDER BY id"
+        with mock.patch.dict(os.environ, {"CLICKHOUSE_MAX_RESULT_ROWS": "1"}):
+            result = asyncio.run(run_select_query(query))
+        self.assertEqual(len(result["rows"]), 1)
+        self.assertTrue(result["truncated"])
+
+    def test_run_select_query_truncated_by_bytes(self):
+        """Test that the byte budget is enforced on the JSON size, not by the server."""
+        query = f"SELECT * FROM {self.test_db}.{self.test_table} ORDER BY id"
+        with mock.patch.dict(os.environ, {"CLICKHOUSE_MAX_RESULT_BYTES": "20"}):
+            with get_clickhouse_pool().connection() as client:
+                settings = build_query_settings(client)
+            result = asyncio.run(run_select_query(query))
+        self.assertNotIn("max_result_bytes", settings)
+        self.assertEqual(settings["max_result_rows"], 100001)
+        self.assertEqual(len(result["rows"]), 1)
+        self.assertTrue(result["truncated"])
+
+    def test_run_select_query_pages_past_result_limits(self):
+        """Test that a cursor is not cut short by the server-side result limits."""
+        query = f"SELECT id FROM {self.test_db}.{self.test_table} ORDER BY id"
+        env = {"CLICKHOUSE_MAX_RESULT_ROWS": "1", "CLICKHOUSE_RESULT_OVERFLOW_MODE": "throw"}
+        with mock.patch.dict(os.environ, env):
+            first = asyncio.run(run_select_query(query, page_size=1))
+            second = asyncio.run(fetch_next_page(first["next_cursor"]))
+        self.assertEqual([row[0] for row in first["rows"]], [1])
+        self.assertEqual([row[0] for row in second["rows"]], [2])
+        self.assertIsNone(second["next_cursor"])
+
+    def test_closed_cursor_client_is_not_reused(self):
+        """Test that the client of a cursor closed before its last page is evicted."""
+        query = f"SELECT id FROM {self.test_db}.{self.test_table} ORDER BY id"
+        pool = get_clickhouse_pool()
+        evicted = pool.stats()["evicted"]
+        result = asyncio.run(run_select_query(query, page_size=1))
+        QUERY_CURSORS.remove(result["next_cursor"])
+        self.assertEqual(pool.stats()["evicted"], evicted + 1)
+
+        result = asyncio.run(run_select_query(query, page_size=2))
+        self.assertIsNone(result["next_cursor"])
+        self.assertEqual(pool.stats()["evicted"], evicted + 1)
+
+    def test_run_select_query_formats(self):
+        """Test the columnar and records result layouts."""
+        query = f"SELECT id, name FROM {self.test_db}.{self.test_table} ORDER BY id"
+        result = asyncio.run(run_select_query(query, format="columns"))
+        self.assertEqual(result["format"], "columns")
+        self.assertEqual(result["data"], [[1, 2], ["Alice", "Bob"]])
+
+        result = asyncio.run(run_select_query(query, format="records"))
+        self.assertEqual(result["rows"][1], {"id": 2, "name": "Bob"})
+
+        with mock.patch.dict(os.environ, {"CLICKHOUSE_COLUMNAR_THRESHOLD_ROWS": "2"}):
+            result = asyncio.run(run_select_query(query))
+        self.assertEqual(result["format"], "columns")
+
+        with self.assertRaises(ToolError):
+            asyncio.run(run_select_query(query, format="csv"))
+
+    def test_run_select_query_export(self):
+        """Test exporting a result to an Arrow IPC file."""
+        import pyarrow
+
+        query = f"SELECT id, name FROM {self.test_db}.{self.test_table} ORDER BY id"
+        with tempfile.TemporaryDirectory() as export_dir:
+            with mock.patch.dict(os.environ, {"CLICKHOUSE_EXPORT_DIR": export_dir}):
+                result = asyncio.run(run_select_query(query, export="arrow"))
+            self.assertEqual(result["row_count"], 2)
+            self.assertEqual([f["name"] for f in result["schema"]], ["id", "name"])
+            with pyarrow.memory_map(result["path"]) as source:
+                table = pyarrow.ipc.open_file(source).read_all()
+        self.assertEqual(table.column("name").to_pylist(), ["Alice", "Bob"])
+
+    def test_run_select_query_result_cache(self):
+        """Test that identical deterministic queries are answered from the result cache."""
+        query = f"SELECT id, name FROM {self.test_db}.{self.test_table} ORDER BY id"
+        with mock.patch.dict(os.environ, {"CLICKHOUSE_RESULT_CACHE_ENABLED": "true"}):
+            first = asyncio.run(run_select_query(query))
+            second = asyncio.run(run_select_query(query.replace(" ", "  ") + ";"))
+            self.assertFalse(first["cached"])
+            self.assertTrue(second["cached"])
+            self.assertEqual(second["rows"], first["rows"])
+
+            asyncio.run(run_select_query("SELECT now()"))
+            self.assertFalse(asyncio.run(run_select_query("SELECT now()"))["cached"])
+
+    def test_readonly_level(self):
+        """Test that queries are read-only unless the server enforces a stricter level."""
+        self.assertEqual(readonly_level("0"), "1")
+        self.assertEqual(readonly_level(None), "1")
+        self.assertEqual(readonly_level("2"), "2")
+
+    def test_result_to_column_is_positional(self):
+        """Test that columns are built positionally and the query column order is checked."""
+        names = [
+            "database", "table", "name", "column_type", "default_kind", "default_expression", "comment"
+        ]
+        column = result_to_column(names, [("db", "t", "id", "UInt32", "", "", "Id")])[0]
+        self.assertEqual((column.name, column.column_type, column.comment), ("id", "UInt32", "Id"))
+        self.assertFalse(hasattr(column, "__dict__"))
+        with self.assertRaises(ValueError):
+            result_to_column(["table", "database"], [("t", "db")])
+
+    def test_http_responses_compressed(self):
+        """Test that large tool results are gzipped unless compression is disabled."""
+        headers = {"Accept": "application/json, text/event-stream", "Accept-Encoding": "gzip"}
+        call = {
+            "jsonrpc": "2.0",
+            "id": 2,
+            "method": "tools/call",
+            "params": {
+                "name": "run_select_query",
+                "arguments": {"query": "SELECT number, toString(number) FROM numbers(200)"},
+            },
+        }
+
+        def call_tool():
+            with TestClient(http_app(mcp, "http")) as client:
+                initialize = {
+                    "jsonrpc": "2.0",
+                    "id": 1,
+                    "method": "initialize",
+                    "params": {
+                        "protocolVersion": "2025-03-26",
+                        "capabilities": {},
+                        "clientInfo": {"name": "test", "version": "1"},
+                    },
+                }
+                response = client.post("/mcp/", json=initialize, headers=headers)
+                session = {"mcp-session-id": response.headers["mcp-session-id"], **headers}
+                initialized = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+                client.post("/mcp/", json=initialized, headers=session)
+                return client.post("/mcp/", json=call, headers=session)
+
+        response = call_tool()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertTrue(response.headers["content-type"].startswith("application/json"))
+        self.assertGreater(len(response.content), COMPRESSION_MINIMUM_SIZE)
+        self.assertFalse(response.json()["result"]["isError"])
+
+        with mock.patch.dict(os.environ, {"CLICKHOUSE_MCP_COMPRESSION": "none"}):
+            response = call_tool()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("content-encoding", response.headers)
+
+    def test_metrics_route(self):
+        """Test that /metrics reports the cache counters and the client pool of each host."""
+        METADATA_CACHE.clear()
+        asyncio.run(list_databases())
+        asyncio.run(list_databases())
+        client = TestClient(mcp.http_app())
+        lines = client.get("/metrics").text.splitlines()
+        self.assertIn('mcp_clickhouse_cache_entries{cache="metadata"} 1', lines)
+        self.assertIn('mcp_clickhouse_cache_entries{cache="result"} 0', lines)
+        prefix = 'mcp_clickhouse_cache_hits{cache="metadata"} '
+        hits = [float(line[len(prefix):]) for line in lines if line.startswith(prefix)]
+        self.assertEqual(len(hits), 1)
+        self.assertGreaterEqual(hits[0], 1)
+        host = get_clickhouse_pool()._client_config["host"]
+        max_size = get_clickhouse_pool().max_size
+        self.assertIn(f'mcp_clickhouse_pool_max_size{{host="{host}"}} {max_size}', lines)
+        in_use = f'mcp_clickhouse_pool_in_use{{host="{host}"}} '
+        self.assertTrue(any(line.startswith(in_use) for line in lines))
+
+    def test_health_routes(self):
+        """Test the health, liveness and readiness routes."""
+        HEALTH.clear()
+        client = TestClient(mcp.http_app())
+        response = client.get("/health")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.text.startswith("OK - Connected to ClickHouse"))
+        self.assertIsNotNone(HEALTH.cached())
+
+        self.assertEqual(client.get("/health/live").text, "OK")
+
+        response = client.get("/health/ready")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["status"], "ready")
+        self.assertTrue(body["clickhouse"]["healthy"])
+        self.assertIn("saturated", body["pool"])
+        self.assertEqual(set(body["executors"]), {"query", "metadata", "chdb", "health"})
+
+    def test_readiness_without_clickhouse(self):
+        """Test that the readiness route answers in the chDB-only configuration."""
+        with mock.patch.dict(os.environ, {"CLICKHOUSE_ENABLED": "false"}):
+            del os.environ["CLICKHOUSE_HOST"]
+            response = TestClient(mcp.http_app()).get("/health/ready")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["status"], "ready")
+        self.assertEqual(body["clickhouse"], {"enabled": False})
+        self.assertNotIn("pool", body)
+        self.assertIn("saturated", body["admission"])
+
     def test_run_select_query_failure(self):
         """Test running a SELECT query with an error."""
         query = f"SELECT * FROM {self.test_db}.non_existent_table"
 
         # Should raise ToolError
         with self.assertRaises(ToolError) as context:
-            run_select_query(query)
+            asyncio.run(run_select_query(query))
 
         self.assertIn("Query execution failed", str(context.exception))
 
     def test_table_and_column_comments(self):
         """Test that table and column comments are correctly retrieved."""
-        result = list_tables(self.test_db)
+        result = asyncio.run(list_tables(self.test_db))
         self.assertIsInstance(result, list)
         self.assertEqual(len(result), 1)
 
@@ -0,0 +1,65 @@
+import asyncio
+import subprocess
+import sys
+import unittest
+import uuid
+
+from dotenv import load_dotenv
+
+from mcp_clickhouse import run_select_query
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+except ImportError:  # pragma: no cover - depends on the environment
+    TracerProvider = None
+
+load_dotenv()
+
+
+class TestTracingWithoutOpenTelemetry(unittest.TestCase):
+    def test_helpers_are_no_ops(self):
+        """Test that tracing imports and does nothing when OpenTelemetry is missing."""
+        code = """
+import sys
+sys.modules["opentelemetry"] = None
+from mcp_clickhouse import tracing
+assert tracing.trace is None
+with tracing.span("test", attribute=1) as current:
+    assert current is None
+with tracing.query_span("SELECT 1", "query-id") as current:
+    assert current is None
+tracing.record_span("test", 0)
+assert tracing.current_trace_id() is None
+"""
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+@unittest.skipIf(TracerProvider is None, "opentelemetry-sdk is not installed")
+class TestTracingWithOpenTelemetry(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(cls.exporter))
+        trace.set_tracer_provider(provider)
+
+    def setUp(self):
+        self.exporter.clear()
+
+    def test_query_tool_records_query_span(self):
+        """Test that run_select_query records a tool span and a ClickHouse query span."""
+        asyncio.run(run_select_query("SELECT 1 AS value"))
+        spans = {span.name: span for span in self.exporter.get_finished_spans()}
+        self.assertIn("mcp.tool run_select_query", spans)
+        attributes = spans["clickhouse.query"].attributes
+        self.assertEqual(attributes["db.system"], "clickhouse")
+        self.assertEqual(attributes["db.statement"], "SELECT 1 AS value")
+        uuid.UUID(attributes["db.clickhouse.query_id"])
+
+
+if __name__ == "__main__":
+    unittest.main()